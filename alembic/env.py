@@ -1,5 +1,5 @@
 from logging.config import fileConfig
-from app.models import User, Post, Vote, Resume, PDF, Payment
+from app.models import User, Post, Vote, Resume, PDF, Payment, DocumentText, CandidateProfile, Job, Blob, Counter, SearchJob
 from app.status import Status
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
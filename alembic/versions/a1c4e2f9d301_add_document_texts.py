@@ -0,0 +1,44 @@
+"""add document texts
+
+Revision ID: a1c4e2f9d301
+Revises: 3f17a84acc52
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c4e2f9d301'
+down_revision: Union[str, None] = '3f17a84acc52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('document_texts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('extractor_version', sa.String(), nullable=False),
+    sa.Column('extracted_text', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash', 'extractor_version', name='uq_document_text_version')
+    )
+    op.create_index(op.f('ix_document_texts_id'), 'document_texts', ['id'], unique=False)
+    op.add_column('pdfs', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('pdfs', sa.Column('file_mtime', sa.Float(), nullable=True))
+    op.create_index(op.f('ix_pdfs_content_hash'), 'pdfs', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_pdfs_content_hash'), table_name='pdfs')
+    op.drop_column('pdfs', 'file_mtime')
+    op.drop_column('pdfs', 'content_hash')
+    op.drop_index(op.f('ix_document_texts_id'), table_name='document_texts')
+    op.drop_table('document_texts')
@@ -0,0 +1,51 @@
+"""add candidate profiles
+
+Revision ID: a6c3e9f1d254
+Revises: f2b8d4e1c937
+Create Date: 2026-10-18 21:34:12.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3e9f1d254'
+down_revision: Union[str, None] = 'f2b8d4e1c937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('candidate_profiles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('extractor_version', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('email_domain', sa.String(), nullable=True),
+    sa.Column('phone', sa.String(), nullable=True),
+    sa.Column('skills', postgresql.ARRAY(sa.String()), server_default=sa.text("'{}'"), nullable=False),
+    sa.Column('page_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('text_length', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash', 'extractor_version', name='uq_candidate_profile_version')
+    )
+    op.create_index(op.f('ix_candidate_profiles_id'), 'candidate_profiles', ['id'], unique=False)
+    op.create_index('ix_candidate_profiles_skills', 'candidate_profiles', ['skills'], unique=False,
+                    postgresql_using='gin')
+    op.create_index('ix_candidate_profiles_email_domain', 'candidate_profiles', ['email_domain'], unique=False)
+    # Build the profiles of existing documents from their stored texts with `python -m app.cli backfill-profiles`
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_candidate_profiles_email_domain', table_name='candidate_profiles')
+    op.drop_index('ix_candidate_profiles_skills', table_name='candidate_profiles', postgresql_using='gin')
+    op.drop_index(op.f('ix_candidate_profiles_id'), table_name='candidate_profiles')
+    op.drop_table('candidate_profiles')
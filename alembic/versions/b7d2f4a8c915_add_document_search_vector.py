@@ -0,0 +1,40 @@
+"""add document search vector
+
+Revision ID: b7d2f4a8c915
+Revises: a1c4e2f9d301
+Create Date: 2026-10-18 11:03:27.540126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f4a8c915'
+down_revision: Union[str, None] = 'a1c4e2f9d301'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('document_texts', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                              sa.Computed("to_tsvector('simple', extracted_text)", persisted=True),
+                                              nullable=True))
+    op.create_index('ix_document_texts_search_vector', 'document_texts', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+    op.add_column('resumes', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('resumes', sa.Column('file_mtime', sa.Float(), nullable=True))
+    op.create_index(op.f('ix_resumes_content_hash'), 'resumes', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_resumes_content_hash'), table_name='resumes')
+    op.drop_column('resumes', 'file_mtime')
+    op.drop_column('resumes', 'content_hash')
+    op.drop_index('ix_document_texts_search_vector', table_name='document_texts', postgresql_using='gin')
+    op.drop_column('document_texts', 'search_vector')
@@ -0,0 +1,52 @@
+"""add search jobs table
+
+Revision ID: b8e4f2a7c619
+Revises: a6c3e9f1d254
+Create Date: 2026-10-18 22:15:37.904126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f2a7c619'
+down_revision: Union[str, None] = 'a6c3e9f1d254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+search_job_status_enum = postgresql.ENUM('QUEUED', 'RUNNING', 'SUCCESS', 'FAILURE', 'CANCELLED',
+                                         name='search_job_status')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    search_job_status_enum.create(op.get_bind())
+
+    op.create_table('search_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM(name='search_job_status', create_type=False), server_default='QUEUED', nullable=False),
+    sa.Column('skills', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('match_all', sa.Boolean(), server_default=sa.text('False'), nullable=False),
+    sa.Column('total', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('processed', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('results', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'[]'::jsonb"), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+    sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('heartbeat_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_search_jobs_user_status', 'search_jobs', ['user_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_search_jobs_user_status', table_name='search_jobs')
+    op.drop_table('search_jobs')
+    search_job_status_enum.drop(op.get_bind())
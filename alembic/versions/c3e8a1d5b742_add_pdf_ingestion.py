@@ -0,0 +1,43 @@
+"""add pdf ingestion
+
+Revision ID: c3e8a1d5b742
+Revises: b7d2f4a8c915
+Create Date: 2026-10-18 13:41:09.227815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a1d5b742'
+down_revision: Union[str, None] = 'b7d2f4a8c915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+# The type already exists, it was created for resumes.status
+status_enum = postgresql.ENUM('SUCCESS', 'FAILURE', 'PENDING', 'NOT_STARTED', name='status', create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pdfs', sa.Column('ingestion_status', status_enum, server_default='NOT_STARTED', nullable=False))
+    op.add_column('pdfs', sa.Column('ingestion_error', sa.String(), nullable=True))
+    op.add_column('pdfs', sa.Column('ingested_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.create_index(op.f('ix_pdfs_ingested_at'), 'pdfs', ['ingested_at'], unique=False)
+    # PDFs whose text is already stored were searchable before, keep them that way. The rest
+    # stay NOT_STARTED and are ingested on the next app start or by `python -m app.cli ingest-pending`.
+    op.execute("""
+        UPDATE pdfs SET ingestion_status = 'SUCCESS', ingested_at = now()
+        WHERE content_hash IN (SELECT content_hash FROM document_texts)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_pdfs_ingested_at'), table_name='pdfs')
+    op.drop_column('pdfs', 'ingested_at')
+    op.drop_column('pdfs', 'ingestion_error')
+    op.drop_column('pdfs', 'ingestion_status')
@@ -0,0 +1,36 @@
+"""add post vote count
+
+Revision ID: c5d1a8e3f742
+Revises: b8e4f2a7c619
+Create Date: 2026-10-18 22:48:05.316720
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d1a8e3f742'
+down_revision: Union[str, None] = 'b8e4f2a7c619'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('vote_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.execute("""
+        UPDATE posts SET vote_count = counts.votes
+        FROM (SELECT post_id, count(*) AS votes FROM votes GROUP BY post_id) AS counts
+        WHERE posts.id = counts.post_id
+    """)
+    op.create_index('ix_posts_vote_count', 'posts', ['vote_count', 'id'], unique=False,
+                    postgresql_where=sa.text('NOT is_deleted'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_vote_count', table_name='posts', postgresql_where=sa.text('NOT is_deleted'))
+    op.drop_column('posts', 'vote_count')
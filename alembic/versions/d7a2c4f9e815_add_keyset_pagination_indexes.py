@@ -0,0 +1,33 @@
+"""add keyset pagination indexes
+
+Revision ID: d7a2c4f9e815
+Revises: c5d1a8e3f742
+Create Date: 2026-10-18 23:20:41.802315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a2c4f9e815'
+down_revision: Union[str, None] = 'c5d1a8e3f742'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('posts', 'users', 'pdfs')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.create_index(f'ix_{table}_created_at_id', table, ['created_at', 'id'], unique=False,
+                        postgresql_where=sa.text('NOT is_deleted'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_index(f'ix_{table}_created_at_id', table_name=table, postgresql_where=sa.text('NOT is_deleted'))
@@ -0,0 +1,30 @@
+"""add pdf deleted_at
+
+Revision ID: f4c7e2a9b316
+Revises: e8b3d5a1c624
+Create Date: 2026-10-19 09:14:52.218307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c7e2a9b316'
+down_revision: Union[str, None] = 'e8b3d5a1c624'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pdfs', sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.create_index(op.f('ix_pdfs_deleted_at'), 'pdfs', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_pdfs_deleted_at'), table_name='pdfs')
+    op.drop_column('pdfs', 'deleted_at')
@@ -0,0 +1,113 @@
+"""
+Maintenance commands, e.g.
+
+    python -m app.cli backfill-texts
+"""
+import argparse
+
+from app.database import SessionLocal
+from app.logger import logger
+from app.models import PDF, Resume
+from app.services import blob_service, text_store_service, ingestion_service, packed_corpus, profile_service, \
+    vote_service
+
+
+def backfill_texts(args):
+    db = SessionLocal()
+    try:
+        for model in (PDF, Resume):
+            processed = text_store_service.backfill_texts(db, model=model, batch_size=args.batch_size)
+            logger.info(f"Text backfill finished, {processed} rows of {model.__tablename__} processed")
+    finally:
+        db.close()
+
+
+def backfill_profiles(args):
+    db = SessionLocal()
+    try:
+        processed = profile_service.backfill_profiles(db, batch_size=args.batch_size)
+        logger.info(f"Profile backfill finished, {processed} profiles built")
+    finally:
+        db.close()
+
+
+def ingest_pending(args):
+    db = SessionLocal()
+    try:
+        processed = ingestion_service.ingest_pending(db, batch_size=args.batch_size)
+        logger.info(f"Ingestion finished, {processed} PDFs processed")
+    finally:
+        db.close()
+
+
+def gc_blobs(args):
+    db = SessionLocal()
+    try:
+        removed = blob_service.gc(db)
+        logger.info(f"Blob garbage collection finished, {removed} blobs removed")
+    finally:
+        db.close()
+
+
+def pack_corpus(args):
+    db = SessionLocal()
+    try:
+        added = packed_corpus.pack(db, batch_size=args.batch_size)
+        logger.info(f"Corpus packing finished, {added} PDFs added: {packed_corpus.corpus.stats()}")
+    finally:
+        db.close()
+
+
+def compact_corpus(args):
+    db = SessionLocal()
+    try:
+        kept, dropped = packed_corpus.compact(db)
+        logger.info(f"Corpus compaction finished, {kept} PDFs kept, {dropped} dropped")
+    finally:
+        db.close()
+
+
+def reconcile_votes(args):
+    db = SessionLocal()
+    try:
+        repaired = vote_service.reconcile_vote_counts(db)
+        logger.info(f"Vote reconciliation finished, {repaired} posts repaired")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill = subparsers.add_parser("backfill-texts", help="Extract and cache text for existing PDFs and resumes")
+    backfill.add_argument("--batch-size", type=int, default=50)
+    backfill.set_defaults(func=backfill_texts)
+
+    profiles = subparsers.add_parser("backfill-profiles", help="Build candidate profiles for stored texts without one")
+    profiles.add_argument("--batch-size", type=int, default=50)
+    profiles.set_defaults(func=backfill_profiles)
+
+    ingest = subparsers.add_parser("ingest-pending", help="Ingest PDFs that were never ingested or failed")
+    ingest.add_argument("--batch-size", type=int, default=50)
+    ingest.set_defaults(func=ingest_pending)
+
+    gc = subparsers.add_parser("gc-blobs", help="Delete stored files no PDF or resume refers to any more")
+    gc.set_defaults(func=gc_blobs)
+
+    pack = subparsers.add_parser("pack-corpus", help="Append ingested PDFs missing from the packed text corpus")
+    pack.add_argument("--batch-size", type=int, default=packed_corpus.PACK_BATCH_SIZE)
+    pack.set_defaults(func=pack_corpus)
+
+    compact = subparsers.add_parser("compact-corpus", help="Rewrite the packed corpus without deleted PDFs")
+    compact.set_defaults(func=compact_corpus)
+
+    votes = subparsers.add_parser("reconcile-votes", help="Recount the votes of posts whose vote count drifted")
+    votes.set_defaults(func=reconcile_votes)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
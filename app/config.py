@@ -15,6 +15,38 @@ class Settings(BaseSettings):
     razorpay_key_secret: str
     razorpay_webhook_secret: str
 
+    # "index" searches the in-process skill index, "sql" runs Postgres full-text search
+    skill_search_engine: str = "index"
+    # Size of the long-lived skill search process pool, 0 means one worker per CPU
+    search_pool_workers: int = 4
+    # Resumes a resume skill search keeps in flight on that pool
+    resume_search_concurrency: int = 4
+    # Background search jobs a user may have queued or running at once
+    search_jobs_per_user: int = 2
+    # A running search job whose progress has not been written for this long is reported failed
+    search_job_stale_seconds: int = 60
+    # Memory budget of the per-process skill search result cache
+    search_cache_max_bytes: int = 32 * 1024 * 1024
+    # Memory budget of the per-process cache of single posts and first feed pages, and how
+    # long clients and proxies may reuse those responses without revalidating
+    post_cache_max_bytes: int = 8 * 1024 * 1024
+    post_cache_max_age_seconds: int = 5
+    # Pages read per file when a skill search has to parse the PDF itself, 0 means all pages
+    pdf_page_cap: int = 50
+    # Background PDF ingestion: parser threads and how many uploads may wait for them
+    ingestion_workers: int = 2
+    ingestion_queue_size: int = 100
+    # Largest accepted upload, checked while the file is streamed to disk
+    max_upload_bytes: int = 20 * 1024 * 1024
+    # Files of a multi-file upload written to disk at the same time
+    upload_concurrency: int = 4
+    # Durable job queue (python -m app.worker): a claimed job is retried by another
+    # worker if not finished within the visibility timeout
+    job_visibility_timeout_seconds: int = 300
+    job_max_attempts: int = 5
+    job_backoff_base_seconds: float = 5
+    job_poll_interval_seconds: float = 1.0
+
     model_config = ConfigDict(env_file = ".env")
     
 settings = Settings()
\ No newline at end of file
@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.staticfiles import StaticFiles
@@ -5,8 +8,23 @@ import os
 from .logger import logger
 from .routers import post, user, auth, vote, resume, pdfs, payment, webhook
 from app.middleware.logging import LoggingMiddleware
+from app.services import blob_service, search_job_service, skillsearch_multiprocessing_service
+from app.services.ingestion_service import ingestion_worker
+from app.utils import NEXT_CURSOR_HEADER
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    skillsearch_multiprocessing_service.start_pool()
+    ingestion_worker.start()
+    ingestion_worker.requeue_unfinished()
+    yield
+    await search_job_service.shutdown()
+    await ingestion_worker.stop()
+    await asyncio.to_thread(skillsearch_multiprocessing_service.shutdown_pool)
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Register middleware
 app.add_middleware(LoggingMiddleware)
@@ -19,10 +37,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browser clients page through the list endpoints with this header
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.mount("/resumes", StaticFiles(directory="resumes"), name="resumes")
 app.mount("/static/pdfs", StaticFiles(directory="pdfs"), name="pdfs")
+app.mount("/blobs", StaticFiles(directory=blob_service.BLOB_DIR), name="blobs")
 
 app.include_router(post.router)
 app.include_router(user.router)
@@ -1,10 +1,11 @@
 from sqlalchemy import Column, Integer, String, Boolean, TIMESTAMP, text, ForeignKey, DateTime, UniqueConstraint, func, \
-    Enum as SqlEnum, Float
-from sqlalchemy.orm import relationship
+    Enum as SqlEnum, Float, Text, Computed, Index, BigInteger
+from sqlalchemy.dialects.postgresql import TSVECTOR, ARRAY, JSONB
+from sqlalchemy.orm import relationship, deferred
 from app.role import Role
 
 from app.database import Base
-from app.status import Status
+from app.status import Status, JobStatus, SearchJobStatus
 
 class Post(Base):
     __tablename__ = "posts"
@@ -18,6 +19,18 @@ class Post(Base):
     updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
     owner_id = Column(Integer, ForeignKey("users.id", ondelete = 'CASCADE'), nullable=False)
     owner = relationship("User")
+    # Number of votes rows for the post, updated in the same transaction as the vote itself
+    vote_count = Column(Integer, nullable=False, server_default=text("0"))
+    # Title words rank above content words, config must match POST_TS_CONFIG in routers/post.py
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', content), 'B')",
+        persisted=True)))
+
+    __table_args__ = (
+        Index('ix_posts_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_posts_vote_count', 'vote_count', 'id', postgresql_where=text("NOT is_deleted")),
+        Index('ix_posts_created_at_id', 'created_at', 'id', postgresql_where=text("NOT is_deleted")),
+    )
 
 class User(Base):
     __tablename__ = "users"
@@ -31,6 +44,10 @@ class User(Base):
     role_id = Column(Integer, ForeignKey("roles.id"))
     role = relationship("Role")
 
+    __table_args__ = (
+        Index('ix_users_created_at_id', 'created_at', 'id', postgresql_where=text("NOT is_deleted")),
+    )
+
 
 class Vote(Base):
     __tablename__ = "votes"
@@ -47,6 +64,8 @@ class Resume(Base):
     filepath = Column(String, nullable=False)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
     status = Column(SqlEnum(Status), nullable=False, server_default=Status.NOT_STARTED.value)
+    content_hash = Column(String(64), nullable=True, index=True)
+    file_mtime = Column(Float, nullable=True)
 
     __table_args__ = (UniqueConstraint('user_id', name='uq_user_resume'),)
 
@@ -58,6 +77,98 @@ class PDF(Base):
     filename = Column(String, nullable=False)
     filepath = Column(String, nullable=False)
     is_deleted = Column(Boolean, nullable=False, server_default=text("False"))
+    content_hash = Column(String(64), nullable=True, index=True)
+    file_mtime = Column(Float, nullable=True)
+    ingestion_status = Column(SqlEnum(Status), nullable=False, server_default=Status.NOT_STARTED.value)
+    ingestion_error = Column(String, nullable=True)
+    ingested_at = Column(TIMESTAMP(timezone=True), nullable=True, index=True)
+    deleted_at = Column(TIMESTAMP(timezone=True), nullable=True, index=True)
+
+    __table_args__ = (
+        Index('ix_pdfs_created_at_id', 'created_at', 'id', postgresql_where=text("NOT is_deleted")),
+    )
+
+
+class DocumentText(Base):
+    __tablename__ = "document_texts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)
+    extractor_version = Column(String, nullable=False)
+    extracted_text = Column(Text, nullable=False)
+    search_vector = Column(TSVECTOR, Computed("to_tsvector('simple', extracted_text)", persisted=True))
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+
+    __table_args__ = (
+        UniqueConstraint('content_hash', 'extractor_version', name='uq_document_text_version'),
+        Index('ix_document_texts_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
+
+# Candidate fields extracted once per document content, so searches never re-parse the text
+class CandidateProfile(Base):
+    __tablename__ = "candidate_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)
+    extractor_version = Column(String, nullable=False)
+    name = Column(String, nullable=True)
+    email = Column(String, nullable=True)
+    email_domain = Column(String, nullable=True)
+    phone = Column(String, nullable=True)
+    # Normalized skills (lowercase tokens joined by spaces) from the ingestion vocabulary
+    skills = Column(ARRAY(String), nullable=False, server_default=text("'{}'"))
+    page_count = Column(Integer, nullable=False, server_default=text("0"))
+    text_length = Column(Integer, nullable=False, server_default=text("0"))
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+
+    __table_args__ = (
+        UniqueConstraint('content_hash', 'extractor_version', name='uq_candidate_profile_version'),
+        Index('ix_candidate_profiles_skills', 'skills', postgresql_using='gin'),
+        Index('ix_candidate_profiles_email_domain', 'email_domain'),
+    )
+
+
+# Content-addressed file shared by every PDF/Resume row whose content_hash equals its sha256
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, server_default=text("0"))
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+    # Touched on every upload of this content so garbage collection leaves just-uploaded blobs alone
+    last_stored_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+
+
+# Named monotonic counters shared by every app process, e.g. the PDF corpus generation
+class Counter(Base):
+    __tablename__ = "counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, server_default=text("0"))
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    status = Column(SqlEnum(JobStatus, name="job_status"), nullable=False, server_default=JobStatus.QUEUED.value)
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    max_attempts = Column(Integer, nullable=False, server_default=text("5"))
+    run_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+    locked_until = Column(TIMESTAMP(timezone=True), nullable=True)
+    locked_by = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (Index('ix_jobs_status_run_at', 'status', 'run_at'),)
 
 
 #-------------------PAYMENT-------------
@@ -74,4 +185,27 @@ class Payment(Base):
     amount = Column(Float, nullable=False)
     status = Column(String, default="created")  # 'created', 'paid', 'failed'
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Skill search run in the background on the process pool, polled and cancelled through the API
+class SearchJob(Base):
+    __tablename__ = "search_jobs"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(SqlEnum(SearchJobStatus, name="search_job_status"), nullable=False,
+                    server_default=SearchJobStatus.QUEUED.value)
+    skills = Column(JSONB, nullable=False)
+    match_all = Column(Boolean, nullable=False, server_default=text("False"))
+    total = Column(Integer, nullable=False, server_default=text("0"))
+    processed = Column(Integer, nullable=False, server_default=text("0"))
+    results = Column(JSONB, nullable=False, server_default=text("'[]'::jsonb"))
+    error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    # Written with every progress update, a running job without one for a while has lost its process
+    heartbeat_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+
+    __table_args__ = (Index('ix_search_jobs_user_status', 'user_id', 'status'),)
@@ -1,11 +1,16 @@
-from typing import List
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query, status
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app import models, oauth2
-from app.database import get_db
-from app.services import multiple_pdfs_service, skillsearch_service, skillsearch_multiprocessing_service
+from app.database import get_db, SessionLocal
+from app.config import settings
+from app.services import multiple_pdfs_service, skillsearch_service, skillsearch_multiprocessing_service, \
+    fulltext_search_service, profile_service, result_cache, search_job_service
 from app.logger import logger
+from app.services.skill_query import parse_skill_query
+from app.utils import NEXT_CURSOR_HEADER
+from app.utilsp.streaming import stream_results
 
 router = APIRouter(
     prefix="/api/pdfs",
@@ -40,23 +45,79 @@ async def upload_multiple_pdfs(
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     """
-    Upload multiple PDF files
+    Upload multiple PDF files, reporting for each file whether it was stored
     """
     try:
-        pdfs = await multiple_pdfs_service.upload_multiple_pdfs(files, db)
+        results = await multiple_pdfs_service.upload_multiple_pdfs(files, db)
+        uploaded = [result for result in results if result["success"]]
         return {
-            "message": f"Successfully uploaded {len(pdfs)} PDFs",
+            "message": f"Successfully uploaded {len(uploaded)} of {len(results)} PDFs",
             "pdfs": [
                 {
-                    "pdf_id": pdf.id,
-                    "filename": pdf.filename
-                } for pdf in pdfs
-            ]
+                    "pdf_id": result["pdf_id"],
+                    "filename": result["stored_filename"]
+                } for result in uploaded
+            ],
+            "results": results
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/profiles")
+async def get_profiles(
+    skills: list[str] = Query([], description="Skills every profile must have, from the ingestion vocabulary"),
+    email_domain: Optional[str] = Query(None, description="Only candidates with an email at this domain"),
+    limit: int = Query(profile_service.DEFAULT_LIMIT, ge=1, le=500, description="Results per page"),
+    after_id: Optional[int] = Query(None, description="Last pdf_id of the previous page"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    """
+    Candidate profiles extracted at ingestion, filtered on indexed columns without reading any PDF
+    """
+    profiles = profile_service.find_pdf_profiles(db, skills=skills, domain=email_domain, limit=limit, after_id=after_id)
+    return {
+        "results": profiles,
+        "next_after_id": profiles[-1]["pdf_id"] if len(profiles) == limit else None,
+    }
+
+@router.post("/search_jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_search_job(
+    skills: list[str] = Query(..., description="List of skills to search for"),
+    match_all: bool = Query(False, description="Only return PDFs that contain every skill"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    """
+    Start a multiprocessing skill search in the background and return its job id right away
+    """
+    job = search_job_service.submit(current_user.id, skills, match_all, db)
+    return {"job_id": job.id, "status": job.status.value}
+
+@router.get("/search_jobs/{job_id}")
+async def get_search_job(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Skip this many results, e.g. the ones already fetched"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    """
+    Progress and results of a search job so far
+    """
+    return search_job_service.get(job_id, current_user.id, db, offset=offset)
+
+@router.delete("/search_jobs/{job_id}")
+async def cancel_search_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    """
+    Cancel a search job, its queued work is dropped from the process pool
+    """
+    return search_job_service.cancel(job_id, current_user.id, db)
+
 @router.get("/{pdf_id}")
 async def get_pdf(
     pdf_id: int,
@@ -73,30 +134,64 @@ async def get_pdf(
 
 @router.get("/")
 async def get_all_pdfs(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     """
-    Get all PDFs with pagination
+    Get all PDFs, newest first, a page at a time
     """
-    pdfs = multiple_pdfs_service.get_all_pdfs(db, skip, limit)
+    try:
+        pdfs, next_cursor = multiple_pdfs_service.get_all_pdfs(db, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return pdfs
 
 
 @router.post("/search_skills", status_code=status.HTTP_200_OK)
 async def search_skills(
-    skills: list[str] = Query(..., description="List of skills to search for"),
+    skills: list[str] = Query(..., description="Skills to search for, optionally weighted as skill^2.0"),
+    required: Optional[list[str]] = Query(None, description="Skills every result must contain"),
+    match_all: bool = Query(False, description="Only return PDFs that contain every skill"),
+    limit: int = Query(skillsearch_service.DEFAULT_LIMIT, ge=1, le=100, description="Results per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    stream: bool = Query(False, description="Stream each match as soon as it is found"),
+    stream_format: Literal["ndjson", "sse"] = Query("ndjson", description="Wire format when streaming"),
+    deadline_ms: Optional[int] = Query(None, gt=0, description="Return partial results after this many milliseconds"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     """
-    Search resumes for matching skills
+    Search resumes for matching skills, best matches first
     """
     logger.info(f"Received skill search request for skills: {skills}")
     try:
-        results = await skillsearch_service.search_skills(skills, db)
+        query = parse_skill_query(skills, required=required, match_all=match_all)
+        after = skillsearch_service.decode_search_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    use_sql = settings.skill_search_engine == "sql"
+    if stream:
+        # The request session is closed before the body is sent, the stream gets its own
+        stream_db = SessionLocal()
+        if use_sql:
+            matches = fulltext_search_service.iter_search_pdfs(query, stream_db, limit=limit, after=after)
+        else:
+            matches = skillsearch_service.iter_search_skills(query, stream_db, limit=limit, after=after)
+        return stream_results(matches, stream_format, deadline_ms, on_close=stream_db.close)
+    try:
+        search = fulltext_search_service.search_pdfs if use_sql else skillsearch_service.search_skills
+        results = await result_cache.cached_search(
+            settings.skill_search_engine, query, db,
+            lambda: search(query, db, deadline_ms=deadline_ms, limit=limit, after=after),
+            limit, cursor
+        )
         logger.info(f"Skill search completed successfully. Found {len(results['results'])} matches")
         return results
     except Exception as e:
@@ -135,6 +230,7 @@ async def match_skills(
 @router.post("/match_skills_multiprocessing", status_code=status.HTTP_200_OK)
 async def match_skills_multiprocessing(
     skills: list[str] = Query(..., description="List of skills to search for"),
+    match_all: bool = Query(False, description="Only return PDFs that contain every skill"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
@@ -143,7 +239,17 @@ async def match_skills_multiprocessing(
     """
     logger.info(f"Received multiprocessing skill search request for skills: {skills}")
     try:
-        results = await skillsearch_multiprocessing_service.search_skills_multiprocessing(skills, db)
+        query = parse_skill_query(skills, match_all=match_all)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # This engine does not rank, weights only strip off the skill names
+        results = await result_cache.cached_search(
+            "multiprocessing", query, db,
+            lambda: skillsearch_multiprocessing_service.search_skills_multiprocessing(
+                list(query.skills), db, match_all=match_all)
+        )
         logger.info(f"Multiprocessing skill search completed successfully. Found {len(results['results'])} matches")
         return results
     except Exception as e:
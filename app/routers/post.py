@@ -1,32 +1,110 @@
 from .. import models, utils
 from .. import schemas,oauth2
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException,APIRouter
+from fastapi import FastAPI, HTTPException,APIRouter, Query, Request, Response
 from fastapi.params import Depends
-from sqlalchemy.orm import session
+from sqlalchemy.orm import session, contains_eager
 from starlette import status
 from datetime import datetime, UTC
+from ..config import settings
 from ..database import get_db
-from sqlalchemy import func
+from ..services import post_cache
+from ..utilsp.conditional import conditional_response
+from sqlalchemy import func, and_, or_, cast, Float
 router = APIRouter(
     prefix="/posts",
     tags=["post"]
 )
 
 
+# Text search config of posts.search_vector, keep both in sync
+POST_TS_CONFIG = "english"
+
+
+def _search_page(query, search: str, limit: int, cursor: Optional[str], offset: int):
+    """
+    Posts matching a web-style search ("quoted phrase", -excluded, or), best ranked first
+    and paged with a keyset on (rank, id). Matches come from the posts.search_vector GIN index.
+    """
+    terms = func.websearch_to_tsquery(POST_TS_CONFIG, search)
+    # As double precision, a real would not compare equal to the rank read back from the cursor
+    rank = cast(func.ts_rank_cd(models.Post.search_vector, terms), Float)
+    query = query.filter(models.Post.search_vector.op("@@")(terms))
+    if cursor:
+        position = utils.decode_cursor(cursor, ("rank", "id"))
+        try:
+            after_rank, after_id = float(position["rank"]), int(position["id"])
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        query = query.filter(or_(rank < after_rank, and_(rank == after_rank, models.Post.id < after_id)))
+    rows = (query.add_columns(rank.label("rank"))
+            .order_by(rank.desc(), models.Post.id.desc())
+            .offset(offset).limit(limit + 1)
+            .all())
+    if len(rows) <= limit:
+        return [post for post, _ in rows], None
+    post, last_rank = rows[limit - 1]
+    return [post for post, _ in rows[:limit]], utils.encode_cursor({"rank": last_rank, "id": post.id})
+
+
+def _feed_page(db: session, limit: int, offset: int, search: str, cursor: Optional[str]):
+    # One round trip: the vote count is a column of the post and the owner is filled from the same row
+    query =  (db.query(models.Post)
+              .join(models.Post.owner)
+              .options(contains_eager(models.Post.owner))
+              .filter(models.Post.is_deleted == False))
+    if search:
+        return _search_page(query, search, limit, cursor, offset)
+    return utils.keyset_page(query, models.Post, limit, cursor, offset)
+
+
+def _feed_entry(db: session, limit: int) -> dict:
+    results, next_cursor = _feed_page(db, limit, 0, "", None)
+    body = [schemas.GetallAllPostsResponse.model_validate({"Post": post, "votes": post.vote_count},
+                                                          from_attributes=True).model_dump(mode="json")
+            for post in results]
+    versions = [post_cache.version(post) for post in results]
+    return {
+        "body": body,
+        "etag": post_cache.feed_etag(limit, versions),
+        "headers": {utils.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {},
+        "versions": versions,
+    }
+
+
 @router.get("/", status_code= status.HTTP_200_OK ,response_model=List[schemas.GetallAllPostsResponse])
-def get_posts(db: session = Depends(get_db), limit: int = 10, offset: int = 0, search: Optional[str] = "" ):
+def get_posts(request: Request, response: Response, db: session = Depends(get_db),
+              limit: int = Query(10, ge=1, le=100), offset: int = Query(0, ge=0),
+              search: Optional[str] = "", cursor: Optional[str] = None):
+
+    search = (search or "").strip()
+    # First pages are what most readers ask for, those are cached and can be revalidated
+    if not (search or cursor or offset):
+        entry = post_cache.cached_feed(limit, db, lambda: _feed_entry(db, limit))
+        return conditional_response(request, entry["body"], entry["etag"], settings.post_cache_max_age_seconds,
+                                    entry["headers"])
+    try:
+        results, next_cursor = _feed_page(db, limit, offset, search, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[utils.NEXT_CURSOR_HEADER] = next_cursor
+    response = [{"Post": post, "votes": post.vote_count} for post in results]
+    return response
 
-    posts = db.query(models.Post).filter(models.Post.is_deleted == False).filter(models.Post.content.contains(search)).limit(limit).offset(offset).all()
 
-    results =  ((db.query(models.Post, func.count(models.Vote.post_id).label("votes")).join(models.Vote, models.Vote.post_id == models.Post.id, isouter=True)
+@router.get("/top", status_code= status.HTTP_200_OK ,response_model=List[schemas.GetallAllPostsResponse])
+def get_top_posts(db: session = Depends(get_db), limit: int = Query(10, ge=1, le=100)):
+
+    # Walks ix_posts_vote_count backwards, no votes are counted
+    results =  (db.query(models.Post)
+                .join(models.Post.owner)
+                .options(contains_eager(models.Post.owner))
                 .filter(models.Post.is_deleted == False)
-                .filter(models.Post.content.contains(search))
-                .group_by(models.Post.id))
-                .limit(limit).offset(offset)
+                .order_by(models.Post.vote_count.desc(), models.Post.id.desc())
+                .limit(limit)
                 .all())
-    response = [{"Post": post, "votes": votes} for post, votes in results]
-    return response
+    return [{"Post": post, "votes": post.vote_count} for post in results]
 
 
 @router.post("/", status_code= status.HTTP_201_CREATED, response_model = schemas.CreatePostResponse)
@@ -37,20 +115,31 @@ def create_posts(post: schemas.PostCreate, db: session = Depends(get_db), curren
     new_post = models.Post(**post.model_dump(), owner_id=current_user.id)
 
     db.add(new_post)
+    post_cache.invalidate_feed(db)
     db.commit()
     db.refresh(new_post)
     return new_post
 
 
 @router.get("/{post_id}", status_code= status.HTTP_200_OK, response_model = schemas.CreatePostResponse)
-def get_post(post_id: int, db: session = Depends(get_db)):
-    post = db.query(models.Post).get(post_id)
-    if post is None or post.is_deleted:
+def get_post(post_id: int, request: Request, db: session = Depends(get_db)):
+
+    def load():
+        post = db.query(models.Post).get(post_id)
+        if post is None or post.is_deleted:
+            return None
+        return {
+            "body": schemas.CreatePostResponse.model_validate(post).model_dump(mode="json"),
+            "etag": post_cache.post_etag(post),
+        }
+
+    entry = post_cache.cached_post(post_id, db, load)
+    if entry is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"error": f"Post with id {post_id} not found or has been deleted"}
         )
-    return post
+    return conditional_response(request, entry["body"], entry["etag"], settings.post_cache_max_age_seconds)
 
 
 @router.delete("/{post_id}", status_code = status.HTTP_200_OK, )
@@ -63,6 +152,7 @@ def delete_post(post_id:int, db: session = Depends(get_db),current_user: models.
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not the owner of the post")
 
     post.is_deleted = True
+    post_cache.invalidate_feed(db)
     db.commit()
     return {"message": f"Post with id {post_id} deleted successfully"}
 
@@ -1,22 +1,26 @@
 # from email.feedparser import headerRE
+import os
+from typing import Literal, Optional
 from fastapi import Query
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status, BackgroundTasks, Header
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status, Header
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from app.services import resume_service
+from app.database import get_db, SessionLocal
+from app.config import settings
+from app.services import blob_service, resume_service, fulltext_search_service, job_queue_service
 from app.schemas import ResumeUploadResponse
 from fastapi.params import Depends
 from app import models, schemas
 from app import oauth2  # For JWT dependency
+from app.utilsp.streaming import stream_results
 router = APIRouter(prefix="/file",
                    tags=["Resumes"]
                    )
 
 
 @router.post("/upload", status_code=status.HTTP_201_CREATED, response_model=ResumeUploadResponse)
-async def upload_resume(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: models.User = Depends(oauth2.get_current_user) ,background_tasks: BackgroundTasks = None):
-    return await resume_service.upload_resume(user_id=current_user.id , file=file, db=db,background_tasks=background_tasks )
+async def upload_resume(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: models.User = Depends(oauth2.get_current_user)):
+    return await resume_service.upload_resume(user_id=current_user.id , file=file, db=db)
 
 
 @router.get("/download")
@@ -25,6 +29,8 @@ def get_resume_url(db: Session = Depends(get_db),current_user:dict = Depends(oau
 
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
+    if blob_service.is_blob_path(resume.filepath):
+        return {"url": "/" + resume.filepath.replace(os.sep, "/")}
     return {"url": f"/resumes/{resume.filename}"}
 
 @router.get("/status")
@@ -34,29 +40,37 @@ def get_status(current_user: models.User = Depends(oauth2.get_current_user),
     resume =  db.query(models.Resume).filter(models.Resume.user_id == current_user.id).first()
     return resume.status.value
 
+@router.get("/jobs/metrics")
+def get_job_metrics(db: Session = Depends(get_db), current_user: models.User = Depends(oauth2.get_current_user)):
+    return job_queue_service.metrics(db)
+
 @router.post("/upload-multiple", status_code=status.HTTP_201_CREATED)
 async def upload_multiple_resumes(
     files: list[UploadFile] = File(...),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user),
-    background_tasks: BackgroundTasks = None
 ):
-    responses = []
-    for file in files:
-        response = await resume_service.upload_resume(
-            user_id=current_user.id,
-            file=file,
-            db=db,
-            background_tasks=background_tasks
-        )
-        responses.append(response)
-    return responses
+    return await resume_service.upload_multiple_resumes(user_id=current_user.id, files=files, db=db)
 
 @router.post("/search-skills", status_code=status.HTTP_200_OK)
 async def search_resumes_by_skills(
     skills: list[str] = Query(..., description="List of skills to search for"),
+    stream: bool = Query(False, description="Stream each match as soon as it is found"),
+    stream_format: Literal["ndjson", "sse"] = Query("ndjson", description="Wire format when streaming"),
+    deadline_ms: Optional[int] = Query(None, gt=0, description="Return partial results after this many milliseconds"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user),
 ):
-    data = await resume_service.parse_resumes_without_multiprocessing(skills=skills, db=db)
+    use_sql = settings.skill_search_engine == "sql"
+    if stream:
+        # The request session is closed before the body is sent, the stream gets its own
+        stream_db = SessionLocal()
+        if use_sql:
+            matches = fulltext_search_service.iter_search_resumes(skills, stream_db)
+        else:
+            matches = resume_service.iter_resume_matches(skills, stream_db)
+        return stream_results(matches, stream_format, deadline_ms, on_close=stream_db.close)
+    if use_sql:
+        return await fulltext_search_service.search_resumes(skills, db, deadline_ms=deadline_ms)
+    data = await resume_service.parse_resumes_without_multiprocessing(skills=skills, db=db, deadline_ms=deadline_ms)
     return data
@@ -1,10 +1,10 @@
 from .. import models,schemas
-from fastapi import FastAPI, HTTPException, APIRouter
+from fastapi import FastAPI, HTTPException, APIRouter, Query, Response
 from fastapi.params import Depends
 from sqlalchemy.orm import session
 from starlette import status
 from datetime import datetime, UTC
-from typing import List
+from typing import List, Optional
 from .. import utils
 from ..database import get_db
 from app.logger import logger
@@ -40,9 +40,15 @@ def create_user(user: schemas.CreateUser, db: session = Depends(get_db)):
     logger.info(f"User created with ID: {new_user.id}, Email: {new_user.email}")
     return new_user
 @router.get("", status_code= status.HTTP_200_OK, response_model=List[schemas.CreateUserResponse])
-def get_users(db: session = Depends(get_db)):
-    users = db.query(models.User).filter(models.User.is_deleted == False).all()
-    print(users)
+def get_users(response: Response, db: session = Depends(get_db), limit: int = Query(100, ge=1, le=1000),
+              cursor: Optional[str] = None):
+    query = db.query(models.User).filter(models.User.is_deleted == False)
+    try:
+        users, next_cursor = utils.keyset_page(query, models.User, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[utils.NEXT_CURSOR_HEADER] = next_cursor
     return users
 
 
@@ -1,6 +1,7 @@
 from typing import List
 
 from fastapi import FastAPI, HTTPException,APIRouter, Response, status,Depends
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from .. import schemas, database, models, oauth2
@@ -17,19 +18,30 @@ def vote(vote: schemas.Vote, db: Session = Depends(database.get_db), current_use
     if not post:
         raise HTTPException(status_code=404, detail="Post does not exist")
 
-    vote_query = db.query(models.Vote).filter(models.Vote.post_id == vote.post_id, models.Vote.user_id == current_user.id)
-    found_vote = vote_query.first()
+    # The vote row and the post's counter change in one transaction, and only when the row
+    # really was inserted or deleted, so concurrent double votes cannot skew the count
     if vote.dir == 1:
-        if found_vote:
+        inserted = db.execute(insert(models.Vote)
+                              .values(post_id=vote.post_id, user_id=current_user.id)
+                              .on_conflict_do_nothing()
+                              .returning(models.Vote.post_id)).first()
+        if not inserted:
+            db.rollback()
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail= "user already voted on this post")
-        new_vote = models.Vote(post_id=vote.post_id, user_id=current_user.id)
-        db.add(new_vote)
-        db.commit()
-        db.refresh(new_vote)
-        return {"message": "successfully voted on this post"}
+        change = 1
     else:
-        if not found_vote:
+        deleted = (db.query(models.Vote)
+                   .filter(models.Vote.post_id == vote.post_id, models.Vote.user_id == current_user.id)
+                   .delete(synchronize_session=False))
+        if not deleted:
+            db.rollback()
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail= "user already voted on this post")
-        vote_query.delete(synchronize_session=False)
-        db.commit()
-        return{"message": "successfully deleted vote"}
+        change = -1
+
+    (db.query(models.Post)
+     .filter(models.Post.id == vote.post_id)
+     .update({models.Post.vote_count: models.Post.vote_count + change}, synchronize_session=False))
+    db.commit()
+    if change == 1:
+        return {"message": "successfully voted on this post"}
+    return{"message": "successfully deleted vote"}
@@ -0,0 +1,152 @@
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.models import Blob
+from app.utilsp.uploads import SavedUpload
+
+BLOB_DIR = "blobs"
+# Uploads are streamed here first and moved into place once their hash is known
+INCOMING_DIR = os.path.join(BLOB_DIR, "incoming")
+os.makedirs(INCOMING_DIR, exist_ok=True)
+
+# Unreferenced blobs younger than this are kept, an upload may be about to reference them
+GC_GRACE = timedelta(hours=1)
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    """
+    Two levels of 256-way sharding keep every directory small: blobs/ab/cd/abcd...ef.pdf
+    """
+    return os.path.join(BLOB_DIR, sha256[:2], sha256[2:4], f"{sha256}{ext}")
+
+
+def is_blob_path(path: str) -> bool:
+    return os.path.normpath(path).startswith(BLOB_DIR + os.sep)
+
+
+def store(saved: SavedUpload, db: Session) -> str:
+    """
+    Move a freshly streamed upload to its content address, or drop it when the same
+    content is already stored. The blob row is written in the caller's transaction,
+    with no reference taken yet. Returns the blob path.
+    """
+    path = blob_path(saved.content_hash, os.path.splitext(saved.filename)[1])
+    # The upsert locks the row until the caller commits, before the file is looked at: a
+    # concurrent gc() has either removed row and file already or waits for this transaction
+    stmt = insert(Blob).values(sha256=saved.content_hash, path=path, size=saved.size)
+    stmt = stmt.on_conflict_do_update(index_elements=[Blob.sha256], set_={"last_stored_at": func.now()})
+    path = db.execute(stmt.returning(Blob.path)).scalar_one()
+
+    if os.path.exists(path):
+        os.remove(saved.filepath)
+        logger.info(f"Upload {saved.filename} duplicates blob {saved.content_hash}")
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(saved.filepath, path)
+    saved.filepath = path
+    return path
+
+
+def add_refs(hashes: Iterable[str], db: Session) -> None:
+    """
+    Count one reference per occurrence, e.g. per PDF row created for the content
+    """
+    for sha256, count in Counter(hashes).items():
+        db.query(Blob).filter(Blob.sha256 == sha256).update(
+            {Blob.ref_count: Blob.ref_count + count}, synchronize_session=False)
+
+
+def release(path: str, db: Session) -> None:
+    """
+    Drop a row's reference to the file at `path`. Blobs are left for gc() to delete,
+    files from before content addressing are removed right away.
+    """
+    if not is_blob_path(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    db.query(Blob).filter(Blob.path == path).update(
+        {Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def gc(db: Session) -> int:
+    """
+    Delete unreferenced blobs and their files, then the orphaned files. Returns the number removed.
+    """
+    deleted = (db.query(Blob)
+               .filter(Blob.ref_count <= 0)
+               .filter(Blob.last_stored_at < func.now() - GC_GRACE)
+               .with_for_update(skip_locked=True)
+               .all())
+    for blob in deleted:
+        db.delete(blob)
+    db.flush()
+    # Files go while the rows are still locked, a store() of the same content waits for
+    # the commit and then finds the file missing and moves its upload in
+    for blob in deleted:
+        _remove(blob.path)
+    db.commit()
+    return len(deleted) + sweep_orphans(db)
+
+
+def sweep_orphans(db: Session, batch_size: int = 1000) -> int:
+    """
+    Delete blob files without a row, left behind when the transaction of a store() that
+    moved them in rolled back, and uploads abandoned in INCOMING_DIR. Files younger than
+    GC_GRACE are kept, their transaction may not have committed yet. Returns the number removed.
+    """
+    cutoff = time.time() - GC_GRACE.total_seconds()
+    removed = 0
+    stale = []
+    for root, _, names in os.walk(BLOB_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            if root == INCOMING_DIR:
+                _remove(path)
+                removed += 1
+            else:
+                stale.append(path)
+
+    for start in range(0, len(stale), batch_size):
+        batch = stale[start:start + batch_size]
+        known = {path for path, in db.query(Blob.path).filter(Blob.path.in_(batch))}
+        for path in batch:
+            if path in known:
+                continue
+            # Claim the hash with a placeholder row: this waits for an uncommitted store() of
+            # the same content and gets nothing back when that one committed its row
+            sha256 = os.path.splitext(os.path.basename(path))[0]
+            claimed = db.execute(insert(Blob).values(sha256=sha256, path=path, size=0)
+                                 .on_conflict_do_nothing(index_elements=[Blob.sha256])
+                                 .returning(Blob.sha256)).scalar()
+            if claimed is None:
+                continue
+            _remove(path)
+            db.query(Blob).filter(Blob.sha256 == sha256).delete(synchronize_session=False)
+            db.commit()
+            removed += 1
+            logger.info(f"Removed orphaned blob file {path}")
+    db.commit()
+    return removed
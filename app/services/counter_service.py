@@ -0,0 +1,28 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import Counter
+
+# Bumped whenever the set of searchable PDFs changes: upload, ingestion, soft delete
+PDF_CORPUS = "pdf_corpus"
+# Bumped whenever the set of live posts changes: create, soft delete
+POST_FEED = "post_feed"
+
+
+def bump(name: str, db: Session) -> None:
+    """
+    Increment a counter in the caller's transaction, so readers see the new value
+    together with the change it stands for
+    """
+    stmt = insert(Counter).values(name=name, value=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Counter.name],
+        set_={"value": Counter.value + 1, "updated_at": func.now()},
+    )
+    db.execute(stmt)
+
+
+def get(name: str, db: Session) -> int:
+    value = db.query(Counter.value).filter(Counter.name == name).scalar()
+    return value or 0
@@ -0,0 +1,181 @@
+import asyncio
+import time
+from itertools import islice
+from typing import List, Optional
+
+from sqlalchemy import and_, func, literal, or_
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.models import PDF, CandidateProfile, DocumentText, Resume, User
+from app.services.skill_query import SkillQuery
+from app.services.skillsearch_service import DEFAULT_LIMIT
+from app.services.text_store_service import EXTRACTOR_VERSION
+from app.status import Status
+from app.utils import encode_cursor
+from app.utilsp.streaming import collect_results, run_blocking
+
+# Postgres text search config used for document_texts.search_vector, keep both in sync
+TS_CONFIG = "simple"
+
+HEADLINE_OPTIONS = "MaxFragments=2, MaxWords=15, MinWords=5"
+
+# Rows fetched per round trip from the server-side cursor
+FETCH_SIZE = 50
+
+
+def _skill_queries(skills: List[str]):
+    skills = list(dict.fromkeys(skills))
+    return skills, [func.phraseto_tsquery(TS_CONFIG, skill) for skill in skills]
+
+
+def _combined_query(queries):
+    combined = queries[0]
+    for query in queries[1:]:
+        combined = combined.op("||")(query)
+    return combined
+
+
+def _text_columns():
+    # Stored profiles first, regexes over the text for documents ingested before profiles existed
+    text_col = DocumentText.extracted_text
+    return [
+        func.coalesce(CandidateProfile.name, func.split_part(func.btrim(text_col), "\n", 1)).label("name"),
+        func.coalesce(CandidateProfile.email, func.substring(text_col, r"[\w.-]+@[\w.-]+"), literal("")).label("email"),
+        func.coalesce(CandidateProfile.phone, func.substring(text_col, r"\y\d{10}\y"), literal("")).label("phone"),
+    ]
+
+
+def _profile_join():
+    return CandidateProfile, and_(CandidateProfile.content_hash == DocumentText.content_hash,
+                                  CandidateProfile.extractor_version == DocumentText.extractor_version)
+
+
+def _match_filter(queries, match_all: bool):
+    conditions = [DocumentText.search_vector.op("@@")(query) for query in queries]
+    return and_(*conditions) if match_all else or_(*conditions)
+
+
+def _matched_columns(queries):
+    return [DocumentText.search_vector.op("@@")(query).label(f"match_{i}") for i, query in enumerate(queries)]
+
+
+async def _fetch_rows(query):
+    """
+    Rows of `query` fetched FETCH_SIZE at a time from a server-side cursor, each fetch in a thread
+    """
+    rows = await run_blocking(iter, query.yield_per(FETCH_SIZE))
+    while True:
+        batch = await run_blocking(list, islice(rows, FETCH_SIZE))
+        if not batch:
+            return
+        for row in batch:
+            yield row
+
+
+def _weighted_rank(query: SkillQuery, queries):
+    ranks = [func.ts_rank(DocumentText.search_vector, q) * weight for q, weight in zip(queries, query.weights)]
+    rank = ranks[0]
+    for term in ranks[1:]:
+        rank = rank + term
+    return rank
+
+
+async def iter_search_pdfs(query: SkillQuery, db: Session, limit: int = DEFAULT_LIMIT, after: Optional[dict] = None):
+    """
+    Skill search over PDFs as a single full-text query, ranked by the weighted sum of
+    each skill's ts_rank and paged with a keyset on (score, id).
+    Rows are fetched from a server-side cursor and yielded as they arrive.
+    """
+    skills, queries = list(query.skills), [func.phraseto_tsquery(TS_CONFIG, skill) for skill in query.skills]
+    combined = _combined_query(queries)
+    score = _weighted_rank(query, queries)
+    if query.required:
+        match_filter = and_(*(DocumentText.search_vector.op("@@")(q)
+                              for skill, q in zip(skills, queries) if skill in query.required))
+    else:
+        match_filter = _match_filter(queries, match_all=False)
+
+    rows = (db.query(PDF.id, score.label("score"),
+                     func.ts_headline(TS_CONFIG, DocumentText.extracted_text, combined, HEADLINE_OPTIONS).label("headline"),
+                     *_text_columns(), *_matched_columns(queries))
+            .join(DocumentText, and_(DocumentText.content_hash == PDF.content_hash,
+                                     DocumentText.extractor_version == EXTRACTOR_VERSION))
+            .outerjoin(*_profile_join())
+            .filter(PDF.is_deleted == False)
+            .filter(PDF.ingestion_status == Status.SUCCESS.value)
+            .filter(match_filter))
+    if after is not None:
+        rows = rows.filter(or_(score < after["score"], and_(score == after["score"], PDF.id > after["id"])))
+    rows = rows.order_by(score.desc(), PDF.id).limit(limit)
+
+    async for row in _fetch_rows(rows):
+        yield {
+            "name": row.name,
+            "email": row.email,
+            "pdf_id": row.id,
+            "matched_skills": [skill for i, skill in enumerate(skills) if getattr(row, f"match_{i}")],
+            "score": round(row.score, 4),
+            "headline": row.headline,
+            "cursor": encode_cursor({"score": row.score, "id": row.id}),
+        }
+        await asyncio.sleep(0)
+
+
+async def search_pdfs(query: SkillQuery, db: Session, deadline_ms: Optional[int] = None,
+                      limit: int = DEFAULT_LIMIT, after: Optional[dict] = None):
+    start_time = time.time()
+    logger.info(f"Starting full-text skill search for skills: {list(query.skills)}")
+
+    # One extra row tells whether there is a next page
+    results, complete = await collect_results(iter_search_pdfs(query, db, limit=limit + 1, after=after), deadline_ms)
+    has_more = len(results) > limit
+    results = results[:limit]
+
+    time_taken = round(time.time() - start_time, 2)
+    logger.info(f"Full-text skill search completed. Found {len(results)} matches. Time taken: {time_taken} seconds")
+    return {
+        "results": results,
+        "next_cursor": results[-1]["cursor"] if has_more else None,
+        "time_taken_seconds": time_taken,
+        "complete": complete
+    }
+
+
+async def iter_search_resumes(skills: List[str], db: Session, match_all: bool = False):
+    """
+    Skill search over uploaded resumes as a single full-text query, joined to the owning user
+    """
+    skills, queries = _skill_queries(skills)
+    combined = _combined_query(queries)
+    rank = func.ts_rank(DocumentText.search_vector, combined).label("rank")
+
+    rows = (db.query(Resume.user_id, User.email.label("username"), rank,
+                     *_text_columns(), *_matched_columns(queries))
+            .join(DocumentText, and_(DocumentText.content_hash == Resume.content_hash,
+                                     DocumentText.extractor_version == EXTRACTOR_VERSION))
+            .outerjoin(*_profile_join())
+            .outerjoin(User, User.id == Resume.user_id)
+            .filter(_match_filter(queries, match_all))
+            .order_by(rank.desc(), Resume.id))
+
+    async for row in _fetch_rows(rows):
+        yield {
+            "user_id": row.user_id,
+            "username": row.username,
+            "name": row.name,
+            "email": row.email,
+            "phone": row.phone,
+            "skills": [skill for i, skill in enumerate(skills) if getattr(row, f"match_{i}")],
+        }
+        await asyncio.sleep(0)
+
+
+async def search_resumes(skills: List[str], db: Session, match_all: bool = False, deadline_ms: Optional[int] = None):
+    start_time = time.time()
+    results, complete = await collect_results(iter_search_resumes(skills, db, match_all=match_all), deadline_ms)
+    return {
+        "results": results,
+        "time_taken_seconds": round(time.time() - start_time, 2),
+        "complete": complete
+    }
@@ -0,0 +1,206 @@
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.logger import logger
+from app.models import PDF
+from app.services import counter_service, packed_corpus, profile_service, text_store_service
+from app.services.skill_index import skill_index
+from app.status import Status
+from app.utilsp.streaming import run_blocking
+
+@dataclass
+class IngestionJob:
+    pdf_id: int
+    content_hash: str
+    filepath: str
+
+
+def ingest_pdf(job: IngestionJob, db: Session) -> None:
+    """
+    Extract text and candidate fields for one PDF, store them and mark the PDF as ingested.
+    Documents whose content was already ingested reuse the stored text.
+    """
+    pdf = db.query(PDF).filter(PDF.id == job.pdf_id).first()
+    if pdf is None:
+        return
+    try:
+        document = text_store_service.get_document(job.content_hash, db)
+        if document is not None:
+            text = document.extracted_text
+        else:
+            text = text_store_service.extract_document_text(job.filepath)
+            text_store_service.store_text(job.content_hash, text, db)
+        if not profile_service.get_profiles([job.content_hash], db):
+            profile_service.store_profiles({job.content_hash: text}, db)
+
+        pdf.ingestion_status = Status.SUCCESS.value
+        pdf.ingestion_error = None
+        # Evaluated by the UPDATE sent at commit, not at transaction start: now() would date a slow
+        # parse too far back for the skill index sync window of other processes
+        pdf.ingested_at = func.clock_timestamp()
+        counter_service.bump(counter_service.PDF_CORPUS, db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ingestion failed for PDF {job.pdf_id}: {e}")
+        pdf.ingestion_status = Status.FAILURE.value
+        pdf.ingestion_error = str(e)[:500]
+        db.commit()
+        return
+
+    # Packed only once the text is committed, so the corpus never holds a PDF that failed.
+    # Readers fall back to the text store for a PDF the append did not reach.
+    try:
+        packed_corpus.corpus.append(pdf.id, text)
+    except OSError as e:
+        logger.warning(f"Could not pack the text of PDF {pdf.id}, `pack-corpus` adds it later: {e}")
+    if not pdf.is_deleted:
+        skill_index.add_document(pdf.id, text)
+    logger.info(f"Ingested PDF {pdf.id} ({pdf.filename})")
+
+
+# Two-key advisory lock taken by the one process that re-queues unfinished PDFs on startup
+REQUEUE_LOCK = (8, 1)
+
+
+def _try_requeue_lock(db: Session) -> bool:
+    locked = db.execute(func.pg_try_advisory_lock(*REQUEUE_LOCK).select()).scalar()
+    db.commit()
+    return locked
+
+
+def _release_requeue_lock(db: Session) -> None:
+    # Session-level, it would outlive db.close() on the pooled connection
+    db.execute(func.pg_advisory_unlock(*REQUEUE_LOCK).select())
+    db.commit()
+
+
+def _unfinished_jobs(db: Session) -> List[IngestionJob]:
+    rows = (db.query(PDF.id, PDF.content_hash, PDF.filepath)
+            .filter(PDF.is_deleted == False)
+            .filter(PDF.ingestion_status.in_([Status.PENDING.value, Status.NOT_STARTED.value]))
+            .filter(PDF.content_hash.isnot(None))
+            .order_by(PDF.id)
+            .all())
+    return [IngestionJob(pdf_id=pdf_id, content_hash=content_hash, filepath=filepath)
+            for pdf_id, content_hash, filepath in rows]
+
+
+def _ingest_in_thread(job: IngestionJob) -> None:
+    db = SessionLocal()
+    try:
+        ingest_pdf(job, db)
+    finally:
+        db.close()
+
+
+class IngestionWorker:
+    """
+    Bounded background ingestion: uploads put jobs on a fixed-size queue and a few
+    consumer tasks parse them in threads, so requests never wait on the parser
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.ingestion_queue_size)
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(settings.ingestion_workers)]
+        logger.info(f"Started {settings.ingestion_workers} ingestion workers")
+
+    def requeue_unfinished(self) -> None:
+        """
+        Queue the PDFs a previous run left PENDING, the in-memory queue does not survive a
+        restart, and rows that were never ingested. Runs in the background of one process.
+        """
+        self.start()
+        self._tasks.append(asyncio.create_task(self._requeue()))
+
+    async def _requeue(self) -> None:
+        db = SessionLocal()
+        try:
+            # Every worker process starts at once, one of them takes the lock and the rest skip
+            if not await run_blocking(_try_requeue_lock, db):
+                return
+            try:
+                jobs = await run_blocking(_unfinished_jobs, db)
+                logger.info(f"Re-queueing {len(jobs)} unfinished PDFs for ingestion")
+                for job in jobs:
+                    await self.enqueue(job)
+                # Held until they are done, a process starting meanwhile would queue them again
+                await self._queue.join()
+            finally:
+                await run_blocking(_release_requeue_lock, db)
+        finally:
+            db.close()
+
+    async def stop(self) -> None:
+        if not self._tasks:
+            return
+        # Queued PDFs stay PENDING and are re-queued by the next start
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Ingestion workers stopped")
+
+    async def enqueue(self, job: IngestionJob) -> None:
+        """
+        Queue a PDF for ingestion, waiting for room when the queue is full
+        """
+        self.start()
+        await self._queue.put(job)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _consume(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await asyncio.to_thread(_ingest_in_thread, job)
+            except Exception as e:
+                logger.error(f"Ingestion worker error for PDF {job.pdf_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+ingestion_worker = IngestionWorker()
+
+
+def ingest_pending(db: Session, batch_size: int = 50) -> int:
+    """
+    Synchronously ingest every PDF that is not ingested yet, e.g. rows created before
+    the pipeline existed or left behind by a restart. Returns the number processed.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        batch = (db.query(PDF)
+                 .filter(PDF.is_deleted == False)
+                 .filter(PDF.ingestion_status != Status.SUCCESS.value)
+                 .filter(PDF.id > last_id)
+                 .order_by(PDF.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        for pdf in batch:
+            text_store_service.refresh_content_hash(pdf)
+            db.commit()
+            if pdf.content_hash:
+                ingest_pdf(IngestionJob(pdf_id=pdf.id, content_hash=pdf.content_hash, filepath=pdf.filepath), db)
+        processed += len(batch)
+        last_id = batch[-1].id
+        logger.info(f"Ingested {processed} pending PDFs")
+    return processed
@@ -0,0 +1,179 @@
+import random
+from datetime import timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logger import logger
+from app.models import Job
+from app.status import JobStatus
+
+MAX_BACKOFF_SECONDS = 3600
+
+
+def enqueue(kind: str, payload: dict, db: Session, max_attempts: Optional[int] = None, commit: bool = True) -> Job:
+    """
+    Add a job to the queue. With commit=False the job is written in the caller's
+    transaction, so it only becomes visible together with the caller's other changes.
+    """
+    job = Job(kind=kind, payload=payload, max_attempts=max_attempts or settings.job_max_attempts)
+    db.add(job)
+    if commit:
+        db.commit()
+        db.refresh(job)
+    logger.info(f"Enqueued {kind} job with payload {payload}")
+    return job
+
+
+def claim(db: Session, worker_id: str, limit: int = 1) -> List[Job]:
+    """
+    Claim up to `limit` runnable jobs. Queued jobs whose run_at has passed are eligible,
+    and so are running jobs whose visibility timeout expired (their worker died) while
+    they still have attempts left.
+    SKIP LOCKED lets any number of workers claim concurrently without blocking each other.
+    """
+    now = func.now()
+    jobs = (db.query(Job)
+            .filter(or_(
+                and_(Job.status == JobStatus.QUEUED.value, Job.run_at <= now),
+                and_(Job.status == JobStatus.RUNNING.value, Job.locked_until < now,
+                     Job.attempts < Job.max_attempts),
+            ))
+            .order_by(Job.run_at, Job.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all())
+
+    for job in jobs:
+        job.status = JobStatus.RUNNING.value
+        job.attempts = job.attempts + 1
+        job.locked_by = worker_id
+        job.locked_until = now + timedelta(seconds=settings.job_visibility_timeout_seconds)
+        job.started_at = now
+    db.commit()
+    return jobs
+
+
+def expire_exhausted(db: Session, limit: int = 100) -> List[Job]:
+    """
+    Mark FAILURE the running jobs whose visibility timeout expired on their last attempt,
+    e.g. because the job keeps killing its worker. Returns them so their give-up handlers can run.
+    """
+    jobs = (db.query(Job)
+            .filter(Job.status == JobStatus.RUNNING.value)
+            .filter(Job.locked_until < func.now())
+            .filter(Job.attempts >= Job.max_attempts)
+            .order_by(Job.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all())
+    for job in jobs:
+        job.status = JobStatus.FAILURE.value
+        job.last_error = f"Worker {job.locked_by} stopped responding on the last attempt"
+        job.locked_until = None
+        job.finished_at = func.now()
+    db.commit()
+    for job in jobs:
+        logger.error(f"Job {job.id} ({job.kind}) failed permanently after {job.attempts} attempts: {job.last_error}")
+    return jobs
+
+
+def _lease(job_id: int, worker_id: str, db: Session) -> Optional[Job]:
+    """
+    The job, locked, if `worker_id` still holds it. A worker that overran the visibility
+    timeout may find it claimed by another worker, or expired, and must leave it alone.
+    """
+    job = (db.query(Job)
+           .filter(Job.id == job_id)
+           .filter(Job.status == JobStatus.RUNNING.value)
+           .filter(Job.locked_by == worker_id)
+           .with_for_update()
+           .first())
+    if job is None:
+        db.rollback()
+        logger.warning(f"Worker {worker_id} lost job {job_id} to another worker, leaving it alone")
+    return job
+
+
+def complete(job: Job, worker_id: str, db: Session) -> bool:
+    """
+    Mark the job done. Returns False if the worker no longer held it.
+    """
+    job = _lease(job.id, worker_id, db)
+    if job is None:
+        return False
+    job.status = JobStatus.SUCCESS.value
+    job.locked_until = None
+    job.last_error = None
+    job.finished_at = func.now()
+    db.commit()
+    return True
+
+
+def backoff_seconds(attempts: int) -> float:
+    """
+    Exponential backoff with jitter: base, 2*base, 4*base... capped at an hour
+    """
+    delay = min(MAX_BACKOFF_SECONDS, settings.job_backoff_base_seconds * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def fail(job: Job, worker_id: str, error: str, db: Session) -> bool:
+    """
+    Record a failed attempt and schedule a retry. Returns False once the job is out of
+    attempts and has been marked FAILURE for good. A job the worker no longer held is
+    left to its new owner.
+    """
+    job = _lease(job.id, worker_id, db)
+    if job is None:
+        return True
+    job.last_error = error[:2000]
+    job.locked_until = None
+    if job.attempts >= job.max_attempts:
+        job.status = JobStatus.FAILURE.value
+        job.finished_at = func.now()
+        db.commit()
+        logger.error(f"Job {job.id} ({job.kind}) failed permanently after {job.attempts} attempts: {error}")
+        return False
+
+    delay = backoff_seconds(job.attempts)
+    job.status = JobStatus.QUEUED.value
+    job.run_at = func.now() + timedelta(seconds=delay)
+    db.commit()
+    logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying in {delay:.1f}s: {error}")
+    return True
+
+
+def metrics(db: Session) -> dict:
+    """
+    Queue depth, age and throughput per job kind
+    """
+    counts = (db.query(Job.kind, Job.status, func.count(Job.id))
+              .group_by(Job.kind, Job.status)
+              .all())
+    per_kind = {}
+    for kind, status, count in counts:
+        per_kind.setdefault(kind, {s.value: 0 for s in JobStatus})[status.value] = count
+
+    oldest_queued = (db.query(Job.kind, func.extract("epoch", func.now() - func.min(Job.created_at)))
+                     .filter(Job.status == JobStatus.QUEUED.value)
+                     .group_by(Job.kind)
+                     .all())
+    recent = (db.query(Job.kind,
+                       func.count(Job.id),
+                       func.avg(func.extract("epoch", Job.finished_at - Job.started_at)),
+                       func.avg(Job.attempts))
+              .filter(Job.status == JobStatus.SUCCESS.value)
+              .filter(Job.finished_at >= func.now() - timedelta(hours=1))
+              .group_by(Job.kind)
+              .all())
+
+    for kind, age in oldest_queued:
+        per_kind[kind]["oldest_queued_seconds"] = round(float(age), 1)
+    for kind, finished, avg_duration, avg_attempts in recent:
+        per_kind[kind]["succeeded_last_hour"] = finished
+        per_kind[kind]["avg_duration_seconds"] = round(float(avg_duration or 0), 3)
+        per_kind[kind]["avg_attempts"] = round(float(avg_attempts or 0), 2)
+    return per_kind
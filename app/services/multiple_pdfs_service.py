@@ -1,75 +1,105 @@
 import os
-from datetime import datetime
-from typing import List
-from uuid import uuid4
+from typing import List, Optional, Tuple
 
-import aiofiles
 from fastapi import UploadFile, HTTPException
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 
 from app import models
 from app.logger import logger
 from app.models import PDF
+from app.services import blob_service, counter_service
+from app.services.ingestion_service import ingestion_worker, IngestionJob
+from app.services.skill_index import skill_index
+from app.status import Status
+from app.utilsp.uploads import SavedUpload, PDF_SIGNATURES, stream_upload_to_disk, stream_uploads_to_disk, \
+    upload_error
+from app.utils import keyset_page
 
-UPLOAD_DIR = "pdfs"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-async def save_pdf_to_disk(file: UploadFile) -> tuple[str, str]:
+async def save_pdf_to_disk(file: UploadFile, db: Session) -> SavedUpload:
     """
-    Save an uploaded PDF file to disk with a unique filename
+    Stream an uploaded PDF to disk, validating and hashing it on the way, and file it under
+    its content hash. Identical files share one blob on disk.
     """
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    file_ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid4().hex}_{timestamp}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-
-    async with aiofiles.open(file_path, "wb") as f:
-        content = await file.read()
-        await f.write(content)
-
-    logger.info(f"Saved PDF file: {file_path} to disk")
-    return file_path, unique_filename
+    saved = await stream_upload_to_disk(file, blob_service.INCOMING_DIR, PDF_SIGNATURES)
+    blob_service.store(saved, db)
+    return saved
 
 async def upload_pdf(file: UploadFile, db: Session) -> PDF:
     """
     Upload a single PDF file and create a record in the database
     """
-    if not file.filename.endswith(".pdf"):
-        logger.warning(f"Attempted to upload unsupported file format: {file.filename}")
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
-
     logger.info(f"Uploading PDF file: {file.filename}")
-    
-    file_path, filename = await save_pdf_to_disk(file)
-    
+
+    saved = await save_pdf_to_disk(file, db)
+
     # Create new PDF record
     new_pdf = PDF(
-        filename=filename,
-        filepath=file_path
+        filename=saved.filename,
+        filepath=saved.filepath,
+        content_hash=saved.content_hash,
+        file_mtime=os.path.getmtime(saved.filepath),
+        ingestion_status=Status.PENDING.value
     )
     
     db.add(new_pdf)
+    blob_service.add_refs([saved.content_hash], db)
+    counter_service.bump(counter_service.PDF_CORPUS, db)
     db.commit()
     db.refresh(new_pdf)
+
+    # Text and candidate fields are extracted in the background, searches pick the PDF up once ingested
+    await ingestion_worker.enqueue(IngestionJob(
+        pdf_id=new_pdf.id, content_hash=saved.content_hash, filepath=saved.filepath
+    ))
     
-    logger.info(f"Successfully saved PDF {filename} at {file_path}")
+    logger.info(f"Successfully saved PDF {saved.filename} at {saved.filepath}")
     return new_pdf
 
-async def upload_multiple_pdfs(files: List[UploadFile], db: Session) -> List[PDF]:
+async def upload_multiple_pdfs(files: List[UploadFile], db: Session) -> List[dict]:
     """
-    Upload multiple PDF files and create records in the database
+    Upload multiple PDF files: the files are streamed to disk concurrently and all
+    records are created with one INSERT ... RETURNING and a single commit.
+    Returns one result per file, in upload order, saying whether it was stored.
     """
-    uploaded_pdfs = []
-    
-    for file in files:
-        try:
-            pdf = await upload_pdf(file, db)
-            uploaded_pdfs.append(pdf)
-        except Exception as e:
-            logger.error(f"Error uploading PDF {file.filename}: {str(e)}")
+    saved_uploads = await stream_uploads_to_disk(files, blob_service.INCOMING_DIR, PDF_SIGNATURES)
+
+    results = []
+    rows = []
+    for file, saved in zip(files, saved_uploads):
+        if isinstance(saved, Exception):
+            logger.error(f"Error uploading PDF {file.filename}: {upload_error(saved)}")
+            results.append({"filename": file.filename, "success": False, "error": upload_error(saved)})
             continue
-    
-    return uploaded_pdfs
+        blob_service.store(saved, db)
+        results.append({"filename": file.filename, "success": True, "stored_filename": saved.filename})
+        rows.append({
+            "filename": saved.filename,
+            "filepath": saved.filepath,
+            "content_hash": saved.content_hash,
+            "file_mtime": os.path.getmtime(saved.filepath),
+            "ingestion_status": Status.PENDING.value,
+        })
+
+    if not rows:
+        db.commit()
+        return results
+
+    inserted = db.execute(insert(PDF).values(rows).returning(PDF.id, PDF.filename, PDF.filepath, PDF.content_hash)).all()
+    blob_service.add_refs([row["content_hash"] for row in rows], db)
+    counter_service.bump(counter_service.PDF_CORPUS, db)
+    db.commit()
+
+    pdf_ids = {row.filename: row.id for row in inserted}
+    for result in results:
+        if result["success"]:
+            result["pdf_id"] = pdf_ids[result["stored_filename"]]
+
+    for row in inserted:
+        await ingestion_worker.enqueue(IngestionJob(pdf_id=row.id, content_hash=row.content_hash, filepath=row.filepath))
+
+    logger.info(f"Uploaded {len(rows)} of {len(files)} PDFs in one batch")
+    return results
 
 def get_pdf_by_id(pdf_id: int, db: Session) -> PDF | None:
     """
@@ -77,11 +107,12 @@ def get_pdf_by_id(pdf_id: int, db: Session) -> PDF | None:
     """
     return db.query(PDF).filter(PDF.id == pdf_id).first()
 
-def get_all_pdfs(db: Session, skip: int = 0, limit: int = 100) -> List[PDF]:
+def get_all_pdfs(db: Session, skip: int = 0, limit: int = 100,
+                 cursor: Optional[str] = None) -> Tuple[List[PDF], Optional[str]]:
     """
-    Fetch all PDF records with pagination
+    Fetch a page of PDF records, newest first, and the cursor of the next page
     """
-    return db.query(PDF).filter(PDF.is_deleted == False).offset(skip).limit(limit).all()
+    return keyset_page(db.query(PDF).filter(PDF.is_deleted == False), PDF, limit, cursor, skip)
 
 def soft_delete_pdf(pdf_id: int, db: Session) -> bool:
     """
@@ -92,5 +123,9 @@ def soft_delete_pdf(pdf_id: int, db: Session) -> bool:
         return False
     
     pdf.is_deleted = True
+    # Stamped at commit like ingested_at, other processes' skill indexes sync deletions by it
+    pdf.deleted_at = func.clock_timestamp()
+    counter_service.bump(counter_service.PDF_CORPUS, db)
     db.commit()
+    skill_index.remove_document(pdf_id)
     return True 
\ No newline at end of file
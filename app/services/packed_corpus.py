@@ -0,0 +1,244 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.models import PDF
+from app.services import text_store_service
+from app.status import Status
+
+CORPUS_DIR = "corpus"
+# Holds the generation number of the live files, replaced atomically by compaction
+CURRENT_FILE = "CURRENT"
+# Appends and compaction from any process serialize on an flock of this file
+LOCK_FILE = "corpus.lock"
+
+# One offset table entry: document id, byte offset and byte length of its text
+RECORD = struct.Struct("<qQQ")
+
+PACK_BATCH_SIZE = 200
+
+
+class PackedCorpus:
+    """
+    Extracted PDF texts packed into one append-only file, with an append-only table of
+    (doc_id, offset, length) records next to it. A later record for a document replaces
+    earlier ones. Every process maps the texts read-only: the file's pages are shared through
+    the page cache and a restarted worker re-reads the offset table instead of querying the
+    text store, which is what makes warm starts fast. Readers still decode the texts they ask
+    for, and the skill index built from them is private to each process.
+    Compaction writes a new generation of both files and switches CURRENT over to it.
+    """
+
+    def __init__(self, directory: str = CORPUS_DIR):
+        self.directory = directory
+        self._generation: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._offsets: Dict[int, Tuple[int, int]] = {}
+        self._table_pos = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _texts_path(self, generation: int) -> str:
+        return self._path(f"texts-{generation}.bin")
+
+    def _table_path(self, generation: int) -> str:
+        return self._path(f"offsets-{generation}.bin")
+
+    def _current_generation(self) -> Optional[int]:
+        try:
+            with open(self._path(CURRENT_FILE)) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _set_current(self, generation: int) -> None:
+        tmp = self._path(CURRENT_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            f.write(str(generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(CURRENT_FILE))
+
+    @contextmanager
+    def _exclusive(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._offsets = {}
+        self._table_pos = 0
+
+    def refresh(self) -> None:
+        """
+        Pick up records appended and compactions done by any process since the last call
+        """
+        with self._lock:
+            generation = self._current_generation()
+            if generation is None:
+                return
+            if generation != self._generation:
+                self._close()
+                self._generation = generation
+            try:
+                with open(self._table_path(generation), "rb") as f:
+                    f.seek(self._table_pos)
+                    data = f.read()
+                size = os.path.getsize(self._texts_path(generation))
+            except FileNotFoundError:
+                # Compacted away between reading CURRENT and opening the files, next call catches up
+                return
+            # A record is written after its text, so every complete record points at mapped bytes
+            usable = len(data) - len(data) % RECORD.size
+            for doc_id, offset, length in RECORD.iter_unpack(data[:usable]):
+                self._offsets[doc_id] = (offset, length)
+            self._table_pos += usable
+            if size and (self._map is None or len(self._map) < size):
+                with open(self._texts_path(generation), "rb") as f:
+                    new_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if self._map is not None:
+                    self._map.close()
+                self._map = new_map
+
+    def append(self, doc_id: int, text: str) -> None:
+        data = text.encode("utf-8", errors="replace")
+        with self._exclusive():
+            generation = self._current_generation()
+            if generation is None:
+                generation = 1
+                open(self._texts_path(generation), "ab").close()
+                open(self._table_path(generation), "ab").close()
+                self._set_current(generation)
+            with open(self._texts_path(generation), "ab") as f:
+                offset = f.tell()
+                f.write(data)
+            with open(self._table_path(generation), "ab") as f:
+                f.write(RECORD.pack(doc_id, offset, len(data)))
+
+    def ids(self) -> Set[int]:
+        self.refresh()
+        with self._lock:
+            return set(self._offsets)
+
+    def _view(self, doc_id: int) -> Optional[Tuple[int, int]]:
+        entry = self._offsets.get(doc_id)
+        if entry is None or self._map is None:
+            return None
+        offset, length = entry
+        return offset, offset + length
+
+    def get_many(self, doc_ids: Iterable[int]) -> Dict[int, str]:
+        """
+        {doc_id: text} for the requested documents found in the corpus
+        """
+        self.refresh()
+        texts = {}
+        with self._lock:
+            for doc_id in doc_ids:
+                span = self._view(doc_id)
+                if span is not None:
+                    texts[doc_id] = self._map[span[0]:span[1]].decode("utf-8", errors="replace")
+        return texts
+
+    def get(self, doc_id: int) -> Optional[str]:
+        return self.get_many([doc_id]).get(doc_id)
+
+    def compact(self, live_ids: Set[int]) -> Tuple[int, int]:
+        """
+        Rewrite the corpus keeping only the latest text of each document in `live_ids`.
+        Returns how many documents were kept and dropped.
+        """
+        with self._exclusive():
+            self.refresh()
+            with self._lock:
+                old = self._generation
+                generation = (old or 0) + 1
+                kept = [doc_id for doc_id in sorted(self._offsets)
+                        if doc_id in live_ids and self._view(doc_id) is not None]
+                with open(self._texts_path(generation), "wb") as texts, \
+                        open(self._table_path(generation), "wb") as table:
+                    for doc_id in kept:
+                        start, end = self._view(doc_id)
+                        table.write(RECORD.pack(doc_id, texts.tell(), end - start))
+                        texts.write(self._map[start:end])
+                    texts.flush()
+                    os.fsync(texts.fileno())
+                    table.flush()
+                    os.fsync(table.fileno())
+                self._set_current(generation)
+                dropped = len(self._offsets) - len(kept)
+                if old is not None:
+                    # Processes still mapping the old file keep reading it until their next refresh
+                    for path in (self._texts_path(old), self._table_path(old)):
+                        os.remove(path)
+        self.refresh()
+        return len(kept), dropped
+
+    def stats(self) -> dict:
+        self.refresh()
+        return {
+            "generation": self._generation,
+            "documents": len(self._offsets),
+            "bytes": len(self._map) if self._map is not None else 0,
+        }
+
+
+corpus = PackedCorpus()
+
+
+def load_pdf_texts(pdfs: Iterable[PDF], db: Session) -> Dict[int, str]:
+    """
+    {pdf id: text} read from the packed corpus, falling back to the text store for
+    PDFs that were not packed yet
+    """
+    pdfs = list(pdfs)
+    texts = corpus.get_many(pdf.id for pdf in pdfs)
+    missing = [pdf for pdf in pdfs if pdf.id not in texts]
+    if missing:
+        texts.update(text_store_service.load_texts(missing, db))
+    return texts
+
+
+def _live_ids(db: Session) -> Set[int]:
+    return {pdf_id for (pdf_id,) in (db.query(PDF.id)
+                                     .filter(PDF.is_deleted == False)
+                                     .filter(PDF.ingestion_status == Status.SUCCESS.value))}
+
+
+def pack(db: Session, batch_size: int = PACK_BATCH_SIZE) -> int:
+    """
+    Append the stored texts of ingested PDFs missing from the corpus. Returns how many were added.
+    """
+    missing = sorted(_live_ids(db) - corpus.ids())
+    for i in range(0, len(missing), batch_size):
+        batch = db.query(PDF).filter(PDF.id.in_(missing[i:i + batch_size])).all()
+        for pdf_id, text in text_store_service.load_texts(batch, db).items():
+            corpus.append(pdf_id, text)
+        logger.info(f"Packed {min(i + batch_size, len(missing))} of {len(missing)} PDFs")
+    return len(missing)
+
+
+def compact(db: Session) -> Tuple[int, int]:
+    """
+    Drop soft-deleted and no longer ingested PDFs from the corpus
+    """
+    return corpus.compact(_live_ids(db))
@@ -0,0 +1,78 @@
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Post
+from app.services import counter_service
+from app.services.result_cache import ResultCache
+from app.utilsp.conditional import make_etag
+
+# Single posts are keyed by their version, first feed pages by the feed generation and
+# revalidated against the versions of the posts they show
+post_cache = ResultCache(settings.post_cache_max_bytes)
+
+
+def version(post: Post) -> list:
+    """
+    What a cached post response depends on, in JSON form: an edit moves updated_at, a vote the count
+    """
+    return [post.id, post.updated_at.isoformat(), post.vote_count]
+
+
+def _live_versions(post_ids: Iterable[int], db: Session) -> List[list]:
+    post_ids = list(post_ids)
+    rows = (db.query(Post.id, Post.updated_at, Post.vote_count)
+            .filter(Post.id.in_(post_ids))
+            .filter(Post.is_deleted == False)
+            .all())
+    by_id = {row.id: version(row) for row in rows}
+    return [by_id[post_id] for post_id in post_ids if post_id in by_id]
+
+
+def invalidate_feed(db: Session) -> None:
+    """
+    Retire the cached feed pages after a post was created or deleted, in the caller's
+    transaction. Edits and votes need no call, feed entries notice them by post version.
+    """
+    counter_service.bump(counter_service.POST_FEED, db)
+
+
+def cached_post(post_id: int, db: Session, load: Callable[[], Optional[dict]]) -> Optional[dict]:
+    """
+    The response entry {"body", "etag"} of a live post, built by `load` unless this version
+    is cached. Costs one primary key lookup when it is.
+    """
+    current = _live_versions([post_id], db)
+    if not current:
+        return None
+    key = ("post", *current[0])
+    entry = post_cache.get(key)
+    if entry is None:
+        entry = load()
+        if entry is not None:
+            post_cache.put(key, entry)
+    return entry
+
+
+def post_etag(post: Post) -> str:
+    return make_etag("post", *version(post))
+
+
+def cached_feed(limit: int, db: Session, load: Callable[[], dict]) -> dict:
+    """
+    The response entry {"body", "etag", "headers", "versions"} of the first feed page.
+    A cached page is served while no post was created or deleted and the posts on it
+    are unchanged, so a vote only rebuilds the pages showing that post.
+    """
+    key = ("feed", limit, counter_service.get(counter_service.POST_FEED, db))
+    entry = post_cache.get(key)
+    if entry is not None and _live_versions((v[0] for v in entry["versions"]), db) == entry["versions"]:
+        return entry
+    entry = load()
+    post_cache.put(key, entry)
+    return entry
+
+
+def feed_etag(limit: int, versions: List[list]) -> str:
+    return make_etag("feed", limit, versions)
@@ -0,0 +1,148 @@
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.models import CandidateProfile, DocumentText, PDF
+from app.services.skill_matcher import match_skills
+from app.services.text_store_service import EXTRACTOR_VERSION, Document
+from app.status import Status
+from app.utils import extract_name, extract_email, extract_phone, normalize_skill
+
+# Skills recorded on every ingested document, query-time search is not limited to these
+SKILL_VOCABULARY = [
+    "python", "java", "javascript", "typescript", "c", "c++", "c#", "go", "golang", "rust", "ruby", "php",
+    "kotlin", "swift", "scala", "r", "matlab", "perl", "bash", "sql", "nosql", "html", "css", "sass",
+    "react", "angular", "vue.js", "node.js", "express", "next.js", "django", "flask", "fastapi", "spring",
+    "spring boot", "laravel", "rails", "ruby on rails", ".net", "asp.net", "postgresql", "mysql", "mongodb",
+    "redis", "elasticsearch", "kafka", "rabbitmq", "graphql", "rest", "grpc", "docker", "kubernetes",
+    "terraform", "ansible", "jenkins", "git", "linux", "aws", "azure", "gcp", "microservices", "ci/cd",
+    "machine learning", "deep learning", "nlp", "computer vision", "data analysis", "data science",
+    "pandas", "numpy", "scikit-learn", "tensorflow", "pytorch", "spark", "hadoop", "airflow", "tableau",
+    "power bi", "excel", "figma", "selenium", "jira", "agile", "scrum", "unit testing",
+]
+
+DEFAULT_LIMIT = 50
+
+
+def normalize_skills(skills: Iterable[str]) -> List[str]:
+    """
+    The form skills are stored in on a profile, so "Node.JS" and "node.js" compare equal
+    """
+    return list(dict.fromkeys(" ".join(normalize_skill(skill)) for skill in skills if normalize_skill(skill)))
+
+
+def email_domain(email: str) -> Optional[str]:
+    _, at, domain = email.rpartition("@")
+    return domain.lower() if at and domain else None
+
+
+def count_pages(text: str) -> int:
+    # pdfminer ends every page with a form feed
+    return text.count("\f") or (1 if text.strip() else 0)
+
+
+def build_profile(text: str) -> dict:
+    email = extract_email(text)
+    return {
+        "name": extract_name(text),
+        "email": email,
+        "email_domain": email_domain(email),
+        "phone": extract_phone(text),
+        "skills": normalize_skills(match_skills(SKILL_VOCABULARY, text)),
+        "page_count": count_pages(text),
+        "text_length": len(text),
+    }
+
+
+def store_profiles(texts: Dict[str, str], db: Session) -> None:
+    """
+    Build and persist profiles for texts keyed by content hash. Existing profiles are left untouched.
+    """
+    if not texts:
+        return
+    stmt = insert(CandidateProfile).values([
+        {"content_hash": content_hash, "extractor_version": EXTRACTOR_VERSION, **build_profile(text)}
+        for content_hash, text in texts.items()
+    ]).on_conflict_do_nothing(constraint="uq_candidate_profile_version")
+    db.execute(stmt)
+    db.commit()
+
+
+def get_profiles(hashes: Iterable[str], db: Session) -> Dict[str, CandidateProfile]:
+    hashes = {content_hash for content_hash in hashes if content_hash}
+    if not hashes:
+        return {}
+    rows = (db.query(CandidateProfile)
+            .filter(CandidateProfile.content_hash.in_(hashes))
+            .filter(CandidateProfile.extractor_version == EXTRACTOR_VERSION)
+            .all())
+    return {profile.content_hash: profile for profile in rows}
+
+
+def ensure_profiles(docs: Iterable[Document], texts: Dict[int, str], db: Session) -> None:
+    """
+    Create the missing profiles of PDFs or resumes whose texts, keyed by id, the caller already has
+    """
+    docs = [doc for doc in docs if doc.content_hash and doc.id in texts]
+    existing = get_profiles((doc.content_hash for doc in docs), db)
+    store_profiles({doc.content_hash: texts[doc.id] for doc in docs if doc.content_hash not in existing}, db)
+
+
+def to_dict(profile: CandidateProfile) -> dict:
+    return {
+        "name": profile.name,
+        "email": profile.email,
+        "phone": profile.phone,
+        "skills": profile.skills,
+        "page_count": profile.page_count,
+        "text_length": profile.text_length,
+    }
+
+
+def find_pdf_profiles(db: Session, skills: Iterable[str] = (), domain: Optional[str] = None,
+                      limit: int = DEFAULT_LIMIT, after_id: Optional[int] = None) -> List[dict]:
+    """
+    Profiles of searchable PDFs having every one of `skills` and an email at `domain`, by PDF id.
+    Served from the skills GIN index and the email domain index, no text or file is read.
+    """
+    query = (db.query(PDF.id, CandidateProfile)
+             .join(CandidateProfile, CandidateProfile.content_hash == PDF.content_hash)
+             .filter(CandidateProfile.extractor_version == EXTRACTOR_VERSION)
+             .filter(PDF.is_deleted == False)
+             .filter(PDF.ingestion_status == Status.SUCCESS.value))
+    wanted = normalize_skills(skills)
+    if wanted:
+        query = query.filter(CandidateProfile.skills.contains(wanted))
+    if domain:
+        query = query.filter(CandidateProfile.email_domain == domain.lower().lstrip("@"))
+    if after_id is not None:
+        query = query.filter(PDF.id > after_id)
+    rows = query.order_by(PDF.id).limit(limit).all()
+    return [{"pdf_id": pdf_id, **to_dict(profile)} for pdf_id, profile in rows]
+
+
+def backfill_profiles(db: Session, batch_size: int = 50) -> int:
+    """
+    Build profiles for every stored text that has none yet. Returns the number of profiles built.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        batch = (db.query(DocumentText.id, DocumentText.content_hash, DocumentText.extracted_text)
+                 .outerjoin(CandidateProfile, (CandidateProfile.content_hash == DocumentText.content_hash)
+                            & (CandidateProfile.extractor_version == DocumentText.extractor_version))
+                 .filter(DocumentText.extractor_version == EXTRACTOR_VERSION)
+                 .filter(CandidateProfile.id == None)
+                 .filter(DocumentText.id > last_id)
+                 .order_by(DocumentText.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        store_profiles({row.content_hash: row.extracted_text for row in batch}, db)
+        processed += len(batch)
+        last_id = batch[-1].id
+        logger.info(f"Built {processed} candidate profiles")
+    return processed
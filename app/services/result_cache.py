@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services import counter_service
+from app.services.skill_query import SkillQuery
+from app.utils import normalize_skill
+
+
+class ResultCache:
+    """
+    LRU cache of search responses bounded by the approximate size of the stored results.
+    Keys carry the corpus generation, so any corpus change makes old entries unreachable
+    and they age out of the LRU order.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple[dict, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: dict) -> None:
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
+
+
+search_cache = ResultCache(settings.search_cache_max_bytes)
+
+
+def _respell(results: List[dict], skills: Iterable[str]) -> List[dict]:
+    # A cached response may come from a query that spelled the skills differently
+    spelling = {" ".join(normalize_skill(skill)): skill for skill in skills}
+    return [
+        {**result, "matched_skills": [spelling.get(" ".join(normalize_skill(s)), s) for s in result["matched_skills"]]}
+        if "matched_skills" in result else result
+        for result in results
+    ]
+
+
+async def cached_search(namespace: str, query: SkillQuery, db: Session, search: Callable[[], Awaitable[dict]],
+                        *variant: Hashable) -> dict:
+    """
+    Serve a search response from the cache or run `search` and cache its response.
+    `variant` holds whatever else shapes the response, e.g. the page size and cursor.
+    Partial responses (deadline reached) are never cached.
+    """
+    start_time = time.time()
+    key = (namespace, query.cache_key(), variant, counter_service.get(counter_service.PDF_CORPUS, db))
+    cached = search_cache.get(key)
+    if cached is not None:
+        response = {**cached, "results": _respell(cached["results"], query.skills),
+                    "time_taken_seconds": round(time.time() - start_time, 2)}
+        hit = True
+    else:
+        response = await search()
+        if response.get("complete", True):
+            search_cache.put(key, response)
+        hit = False
+
+    timing = dict(response.get("timing", {}))
+    timing["cache"] = {"hit": hit, **search_cache.stats()}
+    return {**response, "timing": timing}
@@ -1,146 +1,291 @@
 import os
 import time
-from uuid import uuid4
+from dataclasses import dataclass
+from typing import Optional
 from datetime import datetime
 
-import aiofiles
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session
-from fastapi import BackgroundTasks
 import asyncio
 from app import models
+from app.config import settings
 from app.logger import logger
 from app.models import Resume, User
 from app.schemas import ResumeUploadResponse
+from app.services import blob_service, job_queue_service, profile_service, skillsearch_multiprocessing_service, \
+    text_store_service
+from app.services.skill_matcher import SkillMatcher, get_matcher
 from app.status import Status
 from app.utilsp.notifications import notify_all_services
-from app.utils import extract_skills, read_pdf_text, extract_phone, extract_email, extract_name, extract_text
-
-UPLOAD_DIR = "resumes"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-async def save_file_to_disk(file: UploadFile) -> tuple[str, str]:
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    file_ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid4().hex}_{timestamp}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-
-    async with aiofiles.open(file_path, "wb") as f:
-        content = await file.read()
-        await f.write(content)
-
-    logger.info(f"Saved file: {file_path} to disk")
-    return file_path, unique_filename
-
-async def process_resume(user_id: int, file_path:str,file_name:str, db:Session, resume:Resume):
-
-    await asyncio.sleep(10)
-
-    # Check if resume already exists for user
-    existing_resume = db.query(Resume).filter(Resume.user_id == user_id).first()
-    if existing_resume:
-        # Replace old resume file
-        try:
-            os.remove(existing_resume.filepath)
-        except FileNotFoundError:
-            pass
-        existing_resume.filename = file_name
-        existing_resume.filepath = file_path
-        existing_resume.status = Status.SUCCESS.value
-        db.commit()
-        db.refresh(existing_resume)
-        return existing_resume
-
-    # Save new resume to DB
-    new_resume = Resume(
-        user_id=user_id,
-        filename=file_name,
-        filepath=file_path,
-        status=Status.SUCCESS.value
-    )
-    db.add(new_resume)
+from app.utilsp.streaming import collect_results, run_blocking
+from app.utilsp.uploads import SavedUpload, RESUME_SIGNATURES, stream_upload_to_disk, stream_uploads_to_disk, \
+    upload_error
+from app.utils import extract_phone, extract_email, extract_name
+
+async def save_file_to_disk(file: UploadFile, db: Session) -> SavedUpload:
+    saved = await stream_upload_to_disk(file, blob_service.INCOMING_DIR, RESUME_SIGNATURES)
+    blob_service.store(saved, db)
+    return saved
+
+PROCESS_RESUME_JOB = "process_resume"
+# Stored resume texts matched per thread hop during a resume search
+RESUME_MATCH_BATCH_SIZE = 200
+
+
+def process_resume(user_id: int, file_path: str, file_name: str, db: Session,
+                   content_hash: Optional[str] = None) -> Resume:
+    """
+    Point the user's resume at the newly uploaded file and extract its text.
+    Safe to run more than once for the same upload, the queue retries failed attempts.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Uploaded resume missing on disk: {file_path}")
+    resume = db.query(Resume).filter(Resume.user_id == user_id).first()
+    if resume is None:
+        resume = Resume(user_id=user_id, filename=file_name, filepath=file_path, content_hash=content_hash)
+        db.add(resume)
+        blob_service.add_refs([content_hash], db)
+    elif resume.filepath != file_path:
+        # Swap the reference over to the new file, the old blob is kept while other rows use it
+        blob_service.release(resume.filepath, db)
+        blob_service.add_refs([content_hash], db)
+        resume.filename = file_name
+        resume.filepath = file_path
+        resume.content_hash = content_hash
+        resume.file_mtime = None
     db.commit()
-    db.refresh(new_resume)
+    db.refresh(resume)
 
+    texts = text_store_service.load_texts([resume], db)
+    profile_service.ensure_profiles([resume], texts, db)
+    resume.status = Status.SUCCESS.value
+    db.commit()
 
     logger.info(f"User {user_id} successfully saved {file_name} at {file_path}")
-    return None
+    return resume
 
-async def upload_resume(user_id: int, file: UploadFile, db: Session, background_tasks: BackgroundTasks,) -> ResumeUploadResponse:
-    if not file.filename.endswith((".pdf", ".doc", ".docx")):
-        logger.warning(f"User {user_id} attempted to upload unsupported file format: {file.filename}")
-        raise HTTPException(status_code=400, detail="Unsupported file format")
 
-    logger.info(f"User {user_id} uploading file: {file.filename}")
-    resume = db.query(models.Resume).filter(models.Resume.user_id == user_id).first()
+def run_process_resume_job(payload: dict, db: Session) -> None:
+    process_resume(user_id=payload["user_id"], file_path=payload["file_path"],
+                   file_name=payload["file_name"], db=db, content_hash=payload.get("content_hash"))
 
-    resume.status = Status.PENDING.value
-    db.commit()
-    db.refresh(resume)
 
-    file_path, filename = await save_file_to_disk(file)
+def mark_resume_failed(payload: dict, db: Session) -> None:
+    resume = db.query(Resume).filter(Resume.user_id == payload["user_id"]).first()
+    if resume is not None and resume.status == Status.PENDING:
+        resume.status = Status.FAILURE.value
+        db.commit()
+
 
-    logger.info(f"Saved file to disk at {file_path}")
+def queue_resume(user_id: int, saved: SavedUpload, db: Session) -> None:
+    """
+    Mark the user's resume PENDING and add its processing job, both in the caller's transaction
+    """
+    resume = db.query(models.Resume).filter(models.Resume.user_id == user_id).first()
+    if resume is None:
+        resume = Resume(user_id=user_id, filename=saved.filename, filepath=saved.filepath,
+                        content_hash=saved.content_hash)
+        db.add(resume)
+        blob_service.add_refs([saved.content_hash], db)
+    resume.status = Status.PENDING.value
 
-    background_tasks.add_task(
-        process_resume, user_id=user_id, file_path=file_path, file_name=filename, db=db, resume=resume
+    job_queue_service.enqueue(
+        PROCESS_RESUME_JOB,
+        {"user_id": user_id, "file_path": saved.filepath, "file_name": saved.filename,
+         "content_hash": saved.content_hash},
+        db,
+        commit=False,
     )
 
-    logger.info(f"Background task added to process resume for user {user_id}")
 
-    asyncio.create_task(notify_all_services(user_id, filename))
+async def upload_resume(user_id: int, file: UploadFile, db: Session) -> ResumeUploadResponse:
+    logger.info(f"User {user_id} uploading file: {file.filename}")
+    saved = await save_file_to_disk(file, db)
+
+    logger.info(f"Saved file to disk at {saved.filepath}")
+
+    # Status change and job land in one transaction, the worker picks the job up from there
+    queue_resume(user_id, saved, db)
+    db.commit()
+
+    logger.info(f"Queued resume processing for user {user_id}")
+
+    asyncio.create_task(notify_all_services(user_id, saved.filename))
 
     return ResumeUploadResponse(
         message="Resume uploaded and will be processed shortly.",
-        filename=filename,
+        filename=saved.filename,
         uploaded_at=datetime.utcnow()
     )
 
 
+async def upload_multiple_resumes(user_id: int, files: list[UploadFile], db: Session) -> list[dict]:
+    """
+    Validate and save all files concurrently, then queue the last valid one with a single commit.
+    A user has one resume, so earlier valid files in the batch are reported as superseded
+    and left unreferenced for blob garbage collection.
+    Returns one ResumeUploadResponse-shaped entry per file, with its outcome added.
+    """
+    saved_uploads = await stream_uploads_to_disk(files, blob_service.INCOMING_DIR, RESUME_SIGNATURES)
+
+    results = []
+    current = None
+    for file, saved in zip(files, saved_uploads):
+        if isinstance(saved, Exception):
+            logger.warning(f"User {user_id} upload of {file.filename} rejected: {upload_error(saved)}")
+            results.append({"message": upload_error(saved), "filename": file.filename, "uploaded_at": None,
+                            "success": False, "error": upload_error(saved)})
+            continue
+        blob_service.store(saved, db)
+        if current is not None:
+            current[0].update(message="Superseded by a later file of the same upload", status="superseded")
+        result = {"message": "Resume uploaded and will be processed shortly.", "filename": saved.filename,
+                  "uploaded_at": datetime.utcnow(), "success": True, "original_filename": file.filename,
+                  "status": "queued"}
+        results.append(result)
+        current = (result, saved)
+
+    if current is None:
+        db.commit()
+        return results
+
+    queue_resume(user_id, current[1], db)
+    db.commit()
+    logger.info(f"Queued resume processing for user {user_id}")
+    asyncio.create_task(notify_all_services(user_id, current[1].filename))
+    return results
+
+
 def get_resume_by_user(user_id: int, db: Session) -> Resume | None:
     """
     Fetch the resume record for a given user.
     """
     return db.query(Resume).filter(Resume.user_id == user_id).first()
 
-import traceback
+@dataclass
+class ResumeEntry:
+    user_id: int
+    username: Optional[str]
+    filepath: str
+    content_hash: Optional[str]
+    contact: Optional[dict]
+
+
+def _match_text(matcher: SkillMatcher, skills: list[str], text: Optional[str],
+                contact: Optional[dict]) -> Optional[dict]:
+    if not text:
+        return None
+    found = set(matcher.find(text))
+    matched_skills = [skill for skill in dict.fromkeys(skills) if skill in found]
+    if not matched_skills:
+        return None
+    if contact is None:
+        contact = {"name": extract_name(text), "email": extract_email(text), "phone": extract_phone(text)}
+    return {**contact, "skills": matched_skills}
+
+
+def match_resume(file_path: str, skills: list[str], contact: Optional[dict] = None) -> tuple[str, Optional[dict]]:
+    """
+    Runs on the search process pool for a resume whose text is not stored yet: extract it,
+    match the skills and pull the contact details unless the stored profile has them.
+    Returns the extracted text and the match, None if no skill matched.
+    """
+    text = text_store_service.extract_document_text(file_path)
+    return text, _match_text(get_matcher(skills), skills, text, contact)
 
 
-async def parse_resumes_without_multiprocessing(skills: list[str], db):
+def match_stored_resumes(entries: list[tuple[ResumeEntry, str]], skills: list[str]) -> list[tuple[ResumeEntry, dict]]:
+    """
+    Match a batch of resumes whose text is already stored. No file is read, so this runs
+    in a thread with one compiled matcher instead of shipping the texts to the pool.
+    """
+    matcher = get_matcher(skills)
+    matches = []
+    for entry, text in entries:
+        match = _match_text(matcher, skills, text, entry.contact)
+        if match:
+            matches.append((entry, match))
+    return matches
+
+
+def _load_resumes(db: Session) -> tuple[list[tuple[ResumeEntry, str]], list[ResumeEntry]]:
+    # Stats every file and hashes new or changed ones, kept off the event loop by the caller.
+    # Returns the resumes with a stored text and the ones still to extract.
+    rows = db.query(Resume, User.email).outerjoin(User, User.id == Resume.user_id).all()
+    resumes = [resume for resume, _ in rows]
+    texts = text_store_service.get_cached_texts(resumes, db)
+    contacts = {content_hash: {"name": profile.name, "email": profile.email, "phone": profile.phone}
+                for content_hash, profile in profile_service.get_profiles(
+                    (resume.content_hash for resume in resumes), db).items()}
+    stored, to_extract = [], []
+    for resume, username in rows:
+        entry = ResumeEntry(resume.user_id, username, resume.filepath, resume.content_hash,
+                            contacts.get(resume.content_hash))
+        if resume.id in texts:
+            stored.append((entry, texts[resume.id]))
+        else:
+            to_extract.append(entry)
+    return stored, to_extract
+
+
+def _store_extracted(extracted: dict, db: Session) -> None:
+    text_store_service.store_texts(extracted, db)
+    profile_service.store_profiles(extracted, db)
+
+
+def _resume_result(entry: ResumeEntry, match: dict) -> dict:
+    return {"user_id": entry.user_id, "username": entry.username, **match}
+
+
+async def iter_resume_matches(skills: list[str], db: Session):
+    """
+    Yield matching resumes as they finish. Resumes with a stored text are matched in a
+    thread, RESUME_MATCH_BATCH_SIZE at a time. The others are read once, on the shared
+    process pool with at most settings.resume_search_concurrency resumes in flight, and
+    their texts are stored for the next search. Loading the resumes, hashing their files
+    and storing new texts run in a thread.
+    """
+    stored, to_extract = await run_blocking(_load_resumes, db)
+    logger.info(f"Resume search over {len(stored) + len(to_extract)} resumes, {len(to_extract)} to extract")
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(settings.resume_search_concurrency)
+    extracted = {}
+
+    async def extract_one(entry: ResumeEntry):
+        async with semaphore:
+            text, match = await skillsearch_multiprocessing_service.submit(
+                loop, match_resume, entry.filepath, skills, entry.contact)
+        if text and entry.content_hash:
+            extracted[entry.content_hash] = text
+        return entry, match
+
+    # Extraction starts on the pool while the stored texts are matched
+    tasks = [asyncio.ensure_future(extract_one(entry)) for entry in to_extract]
+    try:
+        for start in range(0, len(stored), RESUME_MATCH_BATCH_SIZE):
+            batch = stored[start:start + RESUME_MATCH_BATCH_SIZE]
+            for entry, match in await asyncio.to_thread(match_stored_resumes, batch, skills):
+                yield _resume_result(entry, match)
+        for next_done in asyncio.as_completed(tasks):
+            entry, match = await next_done
+            if match:
+                yield _resume_result(entry, match)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Keep what was extracted, so the next search finds it stored
+        await run_blocking(_store_extracted, extracted, db)
+
+
+async def parse_resumes_without_multiprocessing(skills: list[str], db, deadline_ms: Optional[int] = None):
     start_time = time.time()
-    results = []
-
-    resumes = db.query(Resume).all()  # No need to await since it's now a sync function
-    loop = asyncio.get_event_loop()
-
-
-    for resume in resumes:
-        # Step 1: Read text from PDF asynchronously
-        text = read_pdf_text(resume.filepath)
-        if not text:
-            continue
 
-        # Step 2: Extract skills
-        matched_skills =  await loop.run_in_executor(None, read_pdf_text, resume.filepath)
-
-        # Step 3: If skills found, extract details
-        if matched_skills:
-            name = extract_name(text)
-            email = extract_email(text)
-            phone = extract_phone(text)
-            user = db.query(User).filter(User.id == resume.user_id).first()
-
-            results.append({
-                "user_id": resume.user_id,
-                "username": user.email if user else None,
-                "name": name,
-                "email": email,
-                "phone": phone,
-                "skills": matched_skills
-            })
+    results, complete = await collect_results(iter_resume_matches(skills, db), deadline_ms)
 
     end_time = time.time()
     return {
         "results": results,
-        "time_taken_seconds": round(end_time - start_time, 2)
-    }
\ No newline at end of file
+        "time_taken_seconds": round(end_time - start_time, 2),
+        "complete": complete
+    }
@@ -0,0 +1,241 @@
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+from typing import List, Optional, Set
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, defer
+
+from app.config import settings
+from app.database import SessionLocal
+from app.logger import logger
+from app.models import SearchJob
+from app.services import skillsearch_multiprocessing_service
+from app.status import SearchJobStatus
+from app.utilsp.streaming import run_blocking
+
+ACTIVE = (SearchJobStatus.QUEUED.value, SearchJobStatus.RUNNING.value)
+
+# How often a running job writes its progress, which is also when it notices a cancellation
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+# Tasks of the jobs this process runs, referenced so they are not garbage collected mid-run
+_tasks: Set[asyncio.Task] = set()
+
+
+def _stale_before():
+    return func.now() - timedelta(seconds=settings.search_job_stale_seconds)
+
+
+def submit(user_id: int, skills: List[str], match_all: bool, db: Session) -> SearchJob:
+    """
+    Record a search job and start it in this process. Raises 429 when the user already
+    has settings.search_jobs_per_user jobs queued or running.
+    """
+    # Serializes submissions of one user, so two requests cannot both pass the cap
+    db.execute(func.pg_advisory_xact_lock(user_id).select())
+    active = (db.query(func.count(SearchJob.id))
+              .filter(SearchJob.user_id == user_id)
+              .filter(SearchJob.status.in_(ACTIVE))
+              .filter(SearchJob.heartbeat_at >= _stale_before())
+              .scalar())
+    if active >= settings.search_jobs_per_user:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail=f"At most {settings.search_jobs_per_user} search jobs may run at once")
+
+    job = SearchJob(id=uuid.uuid4().hex, user_id=user_id, skills=list(dict.fromkeys(skills)), match_all=match_all)
+    db.add(job)
+    db.commit()
+
+    task = asyncio.create_task(run(job.id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    logger.info(f"User {user_id} submitted search job {job.id} for skills {job.skills}")
+    return job
+
+
+def _update_running(job_id: str, db: Session, values: dict) -> bool:
+    """
+    Update the job unless it left the RUNNING state, e.g. because it was cancelled.
+    Returns whether it is still running.
+    """
+    updated = (db.query(SearchJob)
+               .filter(SearchJob.id == job_id)
+               .filter(SearchJob.status == SearchJobStatus.RUNNING.value)
+               .update({**values, "heartbeat_at": func.now()}, synchronize_session=False))
+    db.commit()
+    return bool(updated)
+
+
+def _touch(job_id: str) -> bool:
+    # Own session, this runs next to the planning that holds the job's session
+    db = SessionLocal()
+    try:
+        return _update_running(job_id, db, {})
+    finally:
+        db.close()
+
+
+async def _keep_alive(job_id: str) -> None:
+    """
+    Write the heartbeat while the job does work that sends no progress, e.g. planning
+    """
+    while True:
+        await asyncio.sleep(settings.search_job_stale_seconds / 3)
+        await run_blocking(_touch, job_id)
+
+
+def _finish(job_id: str, db: Session, outcome: SearchJobStatus, error: Optional[str] = None) -> None:
+    _update_running(job_id, db, {"status": outcome.value, "error": error, "finished_at": func.now()})
+
+
+def _start(job_id: str, db: Session) -> Optional[SearchJob]:
+    """
+    QUEUED -> RUNNING, conditional so a job cancelled before it started stays cancelled.
+    Returns the job if this call started it.
+    """
+    started = (db.query(SearchJob)
+               .filter(SearchJob.id == job_id)
+               .filter(SearchJob.status == SearchJobStatus.QUEUED.value)
+               .update({"status": SearchJobStatus.RUNNING.value, "started_at": func.now(),
+                        "heartbeat_at": func.now()}, synchronize_session=False))
+    db.commit()
+    return db.query(SearchJob).filter(SearchJob.id == job_id).one() if started else None
+
+
+async def run(job_id: str) -> None:
+    """
+    Run a search job on the shared process pool, appending results and progress to its row
+    as batches finish. Stops and releases its queued batches once the job is cancelled.
+    Planning and every database write run in a thread, the event loop only schedules batches.
+    """
+    db = SessionLocal()
+    try:
+        job = await run_blocking(_start, job_id, db)
+        if job is None:
+            return
+        skills, match_all = job.skills, job.match_all
+
+        heartbeat = asyncio.create_task(_keep_alive(job_id))
+        try:
+            items, duplicates = await run_blocking(skillsearch_multiprocessing_service.plan_search,
+                                                   skills, db, match_all)
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+        if not await run_blocking(_update_running, job_id, db, {"total": len(items)}):
+            return
+
+        unsaved: List[dict] = []
+        unsaved_files = 0
+        last_saved = time.monotonic()
+
+        async def save() -> bool:
+            nonlocal unsaved, unsaved_files, last_saved
+            results = skillsearch_multiprocessing_service.expand_duplicates(unsaved, duplicates)
+            files = unsaved_files
+            unsaved, unsaved_files, last_saved = [], 0, time.monotonic()
+            # Also the heartbeat, and how a cancellation is noticed
+            return await run_blocking(_update_running, job_id, db, {
+                "results": SearchJob.results.op("||")(literal(results, JSONB)),
+                "processed": SearchJob.processed + files,
+            })
+
+        async def on_progress(results: List[dict], files: int) -> bool:
+            nonlocal unsaved_files
+            unsaved.extend(results)
+            unsaved_files += files
+            if time.monotonic() - last_saved < PROGRESS_INTERVAL_SECONDS:
+                return True
+            return await save()
+
+        loop = asyncio.get_running_loop()
+        await skillsearch_multiprocessing_service.process_adaptively(loop, items, skills, match_all,
+                                                                     on_progress=on_progress,
+                                                                     progress_interval=PROGRESS_INTERVAL_SECONDS)
+        if await save():
+            await run_blocking(_finish, job_id, db, SearchJobStatus.SUCCESS)
+            logger.info(f"Search job {job_id} finished")
+        else:
+            logger.info(f"Search job {job_id} cancelled")
+    except asyncio.CancelledError:
+        db.rollback()
+        _finish(job_id, db, SearchJobStatus.FAILURE, "Server shut down while the job was running")
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Search job {job_id} failed: {e}")
+        _finish(job_id, db, SearchJobStatus.FAILURE, str(e)[:500])
+    finally:
+        db.close()
+
+
+def _get_owned(job_id: str, user_id: int, db: Session) -> SearchJob:
+    job = (db.query(SearchJob)
+           .options(defer(SearchJob.results))
+           .filter(SearchJob.id == job_id)
+           .filter(SearchJob.user_id == user_id)
+           .first())
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Search job not found")
+    return job
+
+
+def get(job_id: str, user_id: int, db: Session, offset: int = 0) -> dict:
+    """
+    State, progress and the results from `offset` on, so pollers only fetch what is new.
+    The slice is taken in Postgres, the results before `offset` are never loaded.
+    """
+    job = _get_owned(job_id, user_id, db)
+    results, result_count = (db.query(
+        func.jsonb_path_query_array(SearchJob.results, "$[$offset to last]", func.jsonb_build_object("offset", offset)),
+        func.jsonb_array_length(SearchJob.results),
+    ).filter(SearchJob.id == job_id).one())
+    if job.status == SearchJobStatus.RUNNING and (
+            db.query(SearchJob.heartbeat_at < _stale_before()).filter(SearchJob.id == job_id).scalar()):
+        _finish(job_id, db, SearchJobStatus.FAILURE, "The process running the job stopped responding")
+        db.refresh(job)
+
+    return {
+        "id": job.id,
+        "status": job.status.value,
+        "skills": job.skills,
+        "match_all": job.match_all,
+        "processed": job.processed,
+        "total": job.total,
+        "progress": round(job.processed / job.total, 3) if job.total else (
+            1.0 if job.status == SearchJobStatus.SUCCESS else 0.0),
+        "results": results,
+        "result_count": result_count,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def cancel(job_id: str, user_id: int, db: Session) -> dict:
+    """
+    Cancel a queued or running job. The process running it stops at its next progress
+    update and drops the batches the pool has not started. Finished jobs are left as they are.
+    """
+    job = _get_owned(job_id, user_id, db)
+    if job.status.value in ACTIVE:
+        job.status = SearchJobStatus.CANCELLED.value
+        job.finished_at = func.now()
+        db.commit()
+        logger.info(f"User {user_id} cancelled search job {job_id}")
+    return get(job_id, user_id, db)
+
+
+async def shutdown() -> None:
+    """
+    Stop the jobs this process runs, called on application shutdown
+    """
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
@@ -0,0 +1,249 @@
+import math
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Counter as TypingCounter, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.models import PDF
+from app.status import Status
+from app.services import packed_corpus
+from app.services.skill_matcher import get_matcher
+from app.services.skill_query import SkillQuery
+from app.utils import tokenize, normalize_skill
+
+# Phrases up to this many tokens get their own posting list. Longer skills are
+# resolved by intersecting their sub-phrases and verified against the text.
+MAX_PHRASE_TOKENS = 3
+
+# BM25 term saturation and document length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SYNC_BATCH_SIZE = 200
+# Watermarks are stamped with clock_timestamp() right at commit, the overlap only has to
+# cover commits that land slightly out of order
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+@dataclass
+class ScoredMatch:
+    score: float
+    matched_skills: List[str]
+
+
+class SkillIndex:
+    """
+    In-memory inverted index from normalized tokens and short phrases to PDF ids and term frequencies.
+    Kept in sync incrementally on ingestion and soft delete, and through sync() for
+    changes made by other worker processes. Only ingested PDFs are indexed.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self.built = False
+        self.last_ingested_at: Optional[datetime] = None
+        self.last_deleted_at: Optional[datetime] = None
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    @staticmethod
+    def _terms(tokens: List[str]) -> TypingCounter[str]:
+        terms = Counter()
+        for size in range(1, MAX_PHRASE_TOKENS + 1):
+            for i in range(len(tokens) - size + 1):
+                terms[" ".join(tokens[i:i + size])] += 1
+        return terms
+
+    def add_document(self, doc_id: int, text: str) -> None:
+        tokens = tokenize(text)
+        terms = self._terms(tokens)
+        with self._lock:
+            self._remove(doc_id)
+            for term, count in terms.items():
+                self._postings[term][doc_id] = count
+            self._doc_terms[doc_id] = set(terms)
+            self._doc_lengths[doc_id] = len(tokens)
+            self._total_length += len(tokens)
+
+    def remove_document(self, doc_id: int) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: int) -> None:
+        self._total_length -= self._doc_lengths.pop(doc_id, 0)
+        for term in self._doc_terms.pop(doc_id, ()):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[term]
+
+    def frequencies(self, phrase: tuple[str, ...]) -> Dict[int, int]:
+        """
+        {doc_id: occurrences} for a normalized phrase. Exact for phrases up to
+        MAX_PHRASE_TOKENS. Longer ones get a superset of documents, with the rarest
+        sub-phrase count as an upper bound of their frequency.
+        """
+        if not phrase:
+            return {}
+        windows = [
+            " ".join(phrase[i:i + MAX_PHRASE_TOKENS])
+            for i in range(max(1, len(phrase) - MAX_PHRASE_TOKENS + 1))
+        ]
+        with self._lock:
+            postings = sorted((self._postings.get(w, {}) for w in windows), key=len)
+            if len(postings) == 1:
+                return dict(postings[0])
+            return {
+                doc_id: min(posting[doc_id] for posting in postings)
+                for doc_id in postings[0]
+                if all(doc_id in posting for posting in postings[1:])
+            }
+
+    def lookup(self, phrase: tuple[str, ...]) -> Set[int]:
+        """
+        Candidate documents for a normalized phrase. Exact for phrases up to
+        MAX_PHRASE_TOKENS, a superset for longer ones.
+        """
+        return set(self.frequencies(phrase))
+
+    def search(self, skills: Iterable[str], match_all: bool = False) -> tuple[Dict[int, List[str]], List[str]]:
+        """
+        Resolve a skill query against the posting lists.
+        Returns {doc_id: matched skills} and the skills whose matches still need
+        verifying against the document text because they are longer than the indexed phrases.
+        """
+        skills = list(dict.fromkeys(skills))
+        postings = {skill: self.lookup(normalize_skill(skill)) for skill in skills}
+
+        if match_all:
+            # Smallest posting list first keeps every intersection step cheap
+            ordered = sorted(postings.values(), key=len)
+            doc_ids = set.intersection(*ordered) if ordered else set()
+        else:
+            doc_ids = set().union(*postings.values()) if postings else set()
+
+        matches = {
+            doc_id: [skill for skill in skills if doc_id in postings[skill]]
+            for doc_id in doc_ids
+        }
+        unverified = [skill for skill in skills if len(normalize_skill(skill)) > MAX_PHRASE_TOKENS]
+        return matches, unverified
+
+    def rank(self, query: SkillQuery) -> tuple[Dict[int, ScoredMatch], List[str]]:
+        """
+        BM25 score of every document matching the query: all required skills and,
+        when nothing is required, at least one skill. Each skill's contribution is
+        multiplied by its weight. Returns the scored matches and the skills that
+        still need verifying against the text, as in search().
+        """
+        with self._lock:
+            frequencies = {skill: self.frequencies(normalize_skill(skill)) for skill in query.skills}
+            total_docs = len(self._doc_terms)
+            avg_length = self._total_length / total_docs if total_docs else 0.0
+
+            if query.required:
+                # Smallest posting list first keeps every intersection step cheap
+                ordered = sorted((set(frequencies[skill]) for skill in query.required), key=len)
+                doc_ids = set.intersection(*ordered)
+            else:
+                doc_ids = set().union(*frequencies.values())
+
+            idf = {
+                skill: math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for skill, postings in frequencies.items()
+            }
+            scored = {}
+            for doc_id in doc_ids:
+                length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths.get(doc_id, 0) / (avg_length or 1))
+                score = 0.0
+                matched = []
+                for skill, weight in zip(query.skills, query.weights):
+                    tf = frequencies[skill].get(doc_id)
+                    if tf:
+                        score += weight * idf[skill] * tf * (BM25_K1 + 1) / (tf + length_norm)
+                        matched.append(skill)
+                scored[doc_id] = ScoredMatch(score=score, matched_skills=matched)
+
+        unverified = [skill for skill in query.skills if len(normalize_skill(skill)) > MAX_PHRASE_TOKENS]
+        return scored, unverified
+
+    def sync(self, db: Session) -> None:
+        """
+        Index PDFs ingested since the last sync and drop those soft-deleted since then
+        """
+        with self._lock:
+            first_sync = self.last_deleted_at is None
+            if first_sync:
+                # Read before the live rows, so a deletion in between falls inside the next window
+                self.last_deleted_at = db.query(
+                    func.coalesce(func.max(PDF.deleted_at), func.clock_timestamp())).scalar()
+            query = (db.query(PDF.id, PDF.ingested_at)
+                     .filter(PDF.is_deleted == False)
+                     .filter(PDF.ingestion_status == Status.SUCCESS.value))
+            if self.last_ingested_at is not None:
+                # Re-scan a short window so rows committed slightly out of order are not missed
+                query = query.filter(PDF.ingested_at >= self.last_ingested_at - SYNC_OVERLAP)
+            rows = query.all()
+
+            missing = [pdf_id for pdf_id, _ in rows if pdf_id not in self._doc_terms]
+            added = 0
+            for i in range(0, len(missing), SYNC_BATCH_SIZE):
+                batch = db.query(PDF).filter(PDF.id.in_(missing[i:i + SYNC_BATCH_SIZE])).all()
+                texts = packed_corpus.load_pdf_texts(batch, db)
+                for pdf_id, text in texts.items():
+                    self.add_document(pdf_id, text)
+                added += len(texts)
+            newest = max((value for _, value in rows if value is not None), default=None)
+            if newest is not None and (self.last_ingested_at is None or newest > self.last_ingested_at):
+                self.last_ingested_at = newest
+
+            if first_sync:
+                # The live rows were all read, anything else indexed by ingestion meanwhile is gone
+                live = {pdf_id for pdf_id, _ in rows}
+                deleted = [pdf_id for pdf_id in self._doc_terms if pdf_id not in live]
+            else:
+                deletions = (db.query(PDF.id, PDF.deleted_at)
+                             .filter(PDF.is_deleted == True)
+                             .filter(PDF.deleted_at >= self.last_deleted_at - SYNC_OVERLAP)
+                             .all())
+                deleted = [pdf_id for pdf_id, _ in deletions if pdf_id in self._doc_terms]
+                self.last_deleted_at = max([self.last_deleted_at, *(value for _, value in deletions)])
+            for pdf_id in deleted:
+                self._remove(pdf_id)
+
+            if added or deleted or not self.built:
+                logger.info(f"Skill index synced: {added} added, {len(deleted)} removed, {len(self)} documents")
+            self.built = True
+
+
+skill_index = SkillIndex()
+
+
+def verify_long_skills(matches: Dict[int, List[str]], unverified: List[str], texts: Dict[int, str],
+                       match_all: bool = False, required: Iterable[str] = ()) -> Dict[int, List[str]]:
+    """
+    Drop long-phrase candidates whose text does not actually contain the phrase,
+    and documents left without a skill the query requires
+    """
+    if not unverified:
+        return matches
+    matcher = get_matcher(unverified)
+    verified = {}
+    for doc_id, matched in matches.items():
+        found = set(matcher.find(texts.get(doc_id, "")))
+        kept = [skill for skill in matched if skill not in unverified or skill in found]
+        if kept and (not match_all or len(kept) == len(matched)) and all(skill in kept for skill in required):
+            verified[doc_id] = kept
+    return verified
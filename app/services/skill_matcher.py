@@ -0,0 +1,124 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Set, Union
+
+from app.utils import tokenize, normalize_skill
+
+MATCHER_CACHE_SIZE = 256
+
+
+class SkillMatcher:
+    """
+    Aho-Corasick automaton over word tokens. One pass over a document finds every
+    skill of the query; matching on whole tokens gives word boundaries for free and
+    tokenize() takes care of case-folding.
+    """
+
+    def __init__(self, skills: Iterable[str]):
+        self.skills: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+
+        for skill in dict.fromkeys(skills):
+            tokens = normalize_skill(skill)
+            # A skill without a word token ("++", "") can never match, counting it would
+            # keep every scan from stopping early
+            if tokens:
+                self.skills.append(skill)
+                self._add(tokens, skill)
+        self._build_failure_links()
+
+    def _add(self, tokens: tuple[str, ...], skill: str) -> None:
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[state][token] = next_state
+            state = next_state
+        self._output[state].add(skill)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(token, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def _advance(self, tokens: Iterable[str], state: int, found: Set[str]) -> int:
+        """
+        Run the automaton over tokens from `state`, adding every skill seen to `found`.
+        Returns the state reached, stopping early once every skill has been found.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        wanted = len(self.skills)
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if output[state]:
+                found |= output[state]
+                if len(found) == wanted:
+                    break
+        return state
+
+    def find(self, text: Union[str, List[str]]) -> List[str]:
+        """
+        Skills found in the text (or an already tokenized text), in query order.
+        Stops scanning as soon as every skill has been seen.
+        """
+        tokens = tokenize(text) if isinstance(text, str) else text
+        found: Set[str] = set()
+        self._advance(tokens, 0, found)
+        return [skill for skill in self.skills if skill in found]
+
+    def scan(self, pages: Iterable[str]) -> List[str]:
+        """
+        Like find() over a document delivered page by page. The automaton state carries
+        over page breaks, so a skill split across two pages still matches, and no further
+        page is pulled from `pages` once every skill has been found.
+        """
+        found: Set[str] = set()
+        state = 0
+        for page in pages:
+            state = self._advance(tokenize(page), state, found)
+            if len(found) == len(self.skills):
+                break
+        return [skill for skill in self.skills if skill in found]
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _compiled(skills: FrozenSet[str]) -> SkillMatcher:
+    return SkillMatcher(sorted(skills))
+
+
+def get_matcher(skills: Iterable[str]) -> SkillMatcher:
+    """
+    Compiled matcher for a skill set, cached so repeated queries reuse the automaton
+    """
+    return _compiled(frozenset(skills))
+
+
+def match_skills(skills: List[str], text: Union[str, List[str]]) -> List[str]:
+    """
+    Skills of the query found in the text, in the order they were asked for
+    """
+    found = set(get_matcher(skills).find(text))
+    return [skill for skill in dict.fromkeys(skills) if skill in found]
+
+
+def scan_skills(skills: List[str], pages: Iterable[str]) -> List[str]:
+    """
+    match_skills() over a document read page by page, stops pulling pages once all skills matched
+    """
+    found = set(get_matcher(skills).scan(pages))
+    return [skill for skill in dict.fromkeys(skills) if skill in found]
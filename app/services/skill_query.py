@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.utils import normalize_skill
+
+WEIGHT_SEPARATOR = "^"
+MAX_WEIGHT = 100.0
+
+
+@dataclass(frozen=True)
+class SkillQuery:
+    """
+    A parsed skill search: every skill in request order, its weight, and which skills
+    a document must contain. Skills not in `required` only add to the score.
+    """
+    skills: Tuple[str, ...]
+    weights: Tuple[float, ...]
+    required: frozenset
+
+    def cache_key(self) -> tuple:
+        """
+        Case- and order-insensitive identity of the query, for result caching
+        """
+        norm = lambda skill: " ".join(normalize_skill(skill))
+        return (
+            tuple(sorted((norm(skill), weight) for skill, weight in zip(self.skills, self.weights))),
+            tuple(sorted(norm(skill) for skill in self.required)),
+        )
+
+
+def _parse_skill(raw: str) -> Tuple[str, float]:
+    skill, separator, weight = raw.rpartition(WEIGHT_SEPARATOR)
+    if not separator:
+        return raw.strip(), 1.0
+    try:
+        value = float(weight)
+    except ValueError:
+        raise ValueError(f"Invalid weight in '{raw}', expected e.g. 'python^2'")
+    if not 0 < value <= MAX_WEIGHT:
+        raise ValueError(f"Weight in '{raw}' must be above 0 and at most {MAX_WEIGHT:g}")
+    return skill.strip(), value
+
+
+def parse_skill_query(skills: Iterable[str], required: Optional[Iterable[str]] = None,
+                      match_all: bool = False) -> SkillQuery:
+    """
+    Parse "skill" or "skill^weight" entries. Required skills are added to the query
+    if missing from `skills`; match_all makes every skill required.
+    """
+    weights: Dict[str, float] = {}
+    required_skills = []
+    for raw in skills:
+        skill, weight = _parse_skill(raw)
+        if skill:
+            weights[skill] = weight
+    for raw in required or []:
+        skill, weight = _parse_skill(raw)
+        if skill:
+            weights.setdefault(skill, weight)
+            required_skills.append(skill)
+    if not weights:
+        raise ValueError("At least one skill is required")
+    if match_all:
+        required_skills = list(weights)
+    return SkillQuery(skills=tuple(weights), weights=tuple(weights.values()), required=frozenset(required_skills))
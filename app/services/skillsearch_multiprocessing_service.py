@@ -1,68 +1,226 @@
+import math
+import os
 import time
-import re
-from typing import List
+from contextlib import closing
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
-from app.models import PDF
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models import PDF, DocumentText
 from app.utils import extract_name, extract_email
 from app.logger import logger
+from app.services import packed_corpus
+from app.services.skill_index import skill_index
+from app.services.skill_matcher import match_skills, scan_skills
+from app.services.text_store_service import EXTRACTOR_VERSION
+from app.status import Status
+from app.utilsp.streaming import run_blocking
 from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import asyncio
+import multiprocessing
 from multiprocessing import cpu_count
 import fitz  # PyMuPDF
 
-def read_pdf_text(filepath):
+# What gets pickled to the workers: (pdf_id, filepath, filename)
+WorkItem = Tuple[int, str, str]
+
+STREAM_CHUNK_SIZE = 500
+
+# The scheduler sizes batches so one takes roughly this long on a worker
+TARGET_BATCH_SECONDS = 0.2
+INITIAL_BATCH_SIZE = 2
+MAX_BATCH_SIZE = 50
+# Weight of the newest observation in the per-file time average
+PARSE_TIME_SMOOTHING = 0.3
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_in_flight = 0
+
+def _init_worker():
+    # Workers never reuse pooled connections they may have inherited
+    engine.dispose(close=False)
+
+def start_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Start the shared worker pool, called once on application startup and again
+    whenever a crashed worker broke the previous pool
+    """
+    global _executor, _pool_size
+    if _executor is None:
+        _pool_size = max_workers or _pool_size or settings.search_pool_workers or cpu_count()
+        # Workers come from a clean server process: forking the app itself would copy the
+        # locks held by its ingestion and to_thread threads
+        _executor = ProcessPoolExecutor(max_workers=_pool_size, initializer=_init_worker,
+                                        mp_context=multiprocessing.get_context("forkserver"))
+        logger.info(f"Started skill search process pool with {_pool_size} workers")
+    return _executor
+
+def _replace_pool(broken: ProcessPoolExecutor) -> None:
+    global _executor
+    if _executor is broken:
+        _executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning("A skill search worker died, replacing the process pool")
+
+def shutdown_pool() -> None:
+    """
+    Stop the shared worker pool, called on application shutdown through a thread
+    since it waits for the running batches
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        logger.info("Skill search process pool stopped")
+
+async def _run_on_pool(loop, fn, args):
+    # A worker crash (e.g. a parser segfault) breaks the whole pool: the work is retried
+    # once on a fresh pool, a second crash is reported to the caller
+    for attempt in range(2):
+        executor = start_pool()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            _replace_pool(executor)
+            if attempt:
+                raise
+
+def submit(loop, fn, *args) -> asyncio.Future:
+    """
+    Run fn on the shared pool, keeping count of the batches in flight
+    """
+    global _in_flight
+    _in_flight += 1
+    future = asyncio.ensure_future(_run_on_pool(loop, fn, args))
+
+    def _done(_):
+        global _in_flight
+        _in_flight -= 1
+
+    future.add_done_callback(_done)
+    return future
+
+def pool_stats() -> dict:
+    # Saturation above 1 means batches are queued behind busy workers
+    return {
+        "workers": _pool_size,
+        "in_flight_batches": _in_flight,
+        "saturation": round(_in_flight / _pool_size, 2) if _pool_size else 0.0,
+    }
+
+def iter_pdf_pages(filepath: str, max_pages: Optional[int] = None):
+    """
+    Yield the text of each page with PyMuPDF (fitz), parsing a page only when it is asked for
+    """
+    with fitz.open(filepath) as doc:
+        for number, page in enumerate(doc):
+            if max_pages and number >= max_pages:
+                break
+            yield page.get_text()
+
+def read_pdf_text(filepath, max_pages: Optional[int] = None):
     """
     Read PDF text using PyMuPDF (fitz) for faster processing
     """
-    text = ""
     try:
-        with fitz.open(filepath) as doc:
-            for page in doc:
-                text += page.get_text()
-        return text
+        return "".join(iter_pdf_pages(filepath, max_pages))
     except Exception as e:
         logger.error(f"Error reading PDF {filepath}: {e}")
         return ""
 
-def process_single_pdf(pdf_data):
+def scan_pdf(filepath: str, skills: List[str]) -> Tuple[List[str], str, int]:
+    """
+    Match skills while reading the file page by page. Reading stops once every skill has
+    matched or settings.pdf_page_cap pages were read. Returns the matched skills, the text
+    of the pages read and how many there were.
+    """
+    pages: List[str] = []
+
+    def read_pages():
+        for page_text in iter_pdf_pages(filepath, settings.pdf_page_cap):
+            pages.append(page_text)
+            yield page_text
+
+    with closing(read_pages()) as page_iter:
+        matched_skills = scan_skills(skills, page_iter)
+    return matched_skills, "".join(pages), len(pages)
+
+def load_cached_texts(pdf_ids: List[int]) -> dict:
+    """
+    Fetch stored texts for a batch from inside a worker, so they never travel through the pool.
+    Packed texts are read from the shared corpus mapping, the rest from the database.
+    """
+    texts = packed_corpus.corpus.get_many(pdf_ids)
+    pdf_ids = [pdf_id for pdf_id in pdf_ids if pdf_id not in texts]
+    if not pdf_ids:
+        return texts
+    db = SessionLocal()
+    try:
+        rows = (db.query(PDF.id, DocumentText.extracted_text)
+                .join(DocumentText, and_(DocumentText.content_hash == PDF.content_hash,
+                                         DocumentText.extractor_version == EXTRACTOR_VERSION))
+                .filter(PDF.id.in_(pdf_ids))
+                .all())
+        texts.update(rows)
+        return texts
+    except Exception as e:
+        logger.error(f"Could not load cached texts, falling back to the files: {e}")
+        return texts
+    finally:
+        db.close()
+
+def process_single_pdf(item: WorkItem, skills: List[str], text: Optional[str], require_all: bool):
     """
     Process a single PDF to extract skills and details
     """
+    pdf_id, filepath, filename = item
     try:
-        pdf, skills = pdf_data
-        logger.info(f"Starting to process PDF: {pdf.filename}")
+        logger.info(f"Starting to process PDF: {filename}")
         
-        # Time the PDF reading operation
+        # Cache misses read the file lazily and stop at the first page that completes the match,
+        # so reading and matching are timed together for them
         read_start = time.time()
-        text = read_pdf_text(pdf.filepath)
-        read_time = round(time.time() - read_start, 2)
-        logger.info(f"PDF read time for {pdf.filename}: {read_time} seconds")
-        
-        if not text:
-            logger.warning(f"No text extracted from PDF: {pdf.filename}")
-            return None
-            
-        # Time the skill matching operation
-        match_start = time.time()
-        matched_skills = [skill for skill in skills if re.search(rf'\b{re.escape(skill)}\b', text, re.IGNORECASE)]
-        match_time = round(time.time() - match_start, 2)
-        logger.info(f"Skill matching time for {pdf.filename}: {match_time} seconds")
-        
+        if text is None:
+            matched_skills, text, pages_read = scan_pdf(filepath, skills)
+            read_time = round(time.time() - read_start, 2)
+            match_time = 0.0
+            logger.info(f"PDF scan time for {filename}: {read_time} seconds, {pages_read} pages read")
+            if not text:
+                logger.warning(f"No text extracted from PDF: {filename}")
+                return None
+        else:
+            if not text:
+                logger.warning(f"No text extracted from PDF: {filename}")
+                return None
+            # Time the skill matching operation, verifying the index candidates against the text
+            read_time = 0.0
+            match_start = time.time()
+            matched_skills = match_skills(skills, text)
+            match_time = round(time.time() - match_start, 2)
+            logger.info(f"Skill matching time for {filename}: {match_time} seconds")
+
+        if require_all and len(matched_skills) < len(skills):
+            matched_skills = []
+
         if matched_skills:
             # Time the name and email extraction
             extract_start = time.time()
             name = extract_name(text)
             email = extract_email(text)
             extract_time = round(time.time() - extract_start, 2)
-            logger.info(f"Name/Email extraction time for {pdf.filename}: {extract_time} seconds")
+            logger.info(f"Name/Email extraction time for {filename}: {extract_time} seconds")
             
             total_time = round(read_time + match_time + extract_time, 2)
-            logger.info(f"Total processing time for {pdf.filename}: {total_time} seconds")
+            logger.info(f"Total processing time for {filename}: {total_time} seconds")
             
             return {
                 "name": name,
                 "email": email,
-                "pdf_id": pdf.id,
+                "pdf_id": pdf_id,
                 "matched_skills": matched_skills,
                 "timing": {
                     "read_time": read_time,
@@ -73,74 +231,196 @@ def process_single_pdf(pdf_data):
             }
         return None
     except Exception as e:
-        logger.error(f"Error processing PDF {pdf.filename}: {e}")
+        logger.error(f"Error processing PDF {filename}: {e}")
         return None
 
-def process_batch(batch_data):
+def process_batch(batch: List[WorkItem], skills: List[str], require_all: bool):
     """
-    Process a batch of PDFs and return list of results
+    Process a batch of PDFs and return its results with the worker's busy time
     """
+    started = time.perf_counter()
+    texts = load_cached_texts([item[0] for item in batch])
     results = []
-    for pdf_data in batch_data:
-        result = process_single_pdf(pdf_data)
+    for item in batch:
+        result = process_single_pdf(item, skills, texts.get(item[0]), require_all)
         if result:
             results.append(result)
-    return results
+    return {
+        "results": results,
+        "worker_pid": os.getpid(),
+        "busy_time": time.perf_counter() - started,
+        "files": len(batch),
+    }
 
-async def process_in_waves(executor, loop, batches, wave_size=10):
+def order_largest_first(items: List[WorkItem]) -> List[WorkItem]:
     """
-    Process batches in waves to avoid overloading the event loop
+    Sort work so the slowest files start first and small ones fill the gaps at the end
     """
+    def file_size(item: WorkItem) -> int:
+        try:
+            return os.path.getsize(item[1])
+        except OSError:
+            return 0
+    return sorted(items, key=file_size, reverse=True)
+
+def next_batch_size(per_file_seconds: Optional[float], remaining: int, workers: int) -> int:
+    """
+    Batch size that keeps a batch near TARGET_BATCH_SECONDS, shrinking towards the end
+    of the queue so the last batches spread over every worker
+    """
+    if per_file_seconds is None:
+        size = INITIAL_BATCH_SIZE
+    elif per_file_seconds <= 0:
+        size = MAX_BATCH_SIZE
+    else:
+        size = round(TARGET_BATCH_SECONDS / per_file_seconds)
+    size = min(size, math.ceil(remaining / max(1, workers)))
+    return max(1, min(MAX_BATCH_SIZE, size))
+
+async def process_adaptively(loop, items: List[WorkItem], skills: List[str], require_all: bool,
+                             on_progress: Optional[Callable[[List[dict], int], Awaitable[bool]]] = None,
+                             progress_interval: Optional[float] = None):
+    """
+    Feed the pool continuously instead of in waves: keep two batches queued per worker,
+    submit the next one as soon as any finishes and tune the batch size from observed
+    per-file processing times. Returns the batch results and scheduler statistics.
+    on_progress is awaited with the results and file count of every finished round of
+    batches, and at least every progress_interval seconds while batches run; returning
+    False stops the run. Batches that have not started yet are cancelled whenever the run
+    ends early, including when this coroutine is cancelled.
+    """
+    start_pool()
+    workers = _pool_size
+    max_in_flight = workers * 2
+    # One stat() per file, kept off the event loop
+    queue = deque(await asyncio.to_thread(order_largest_first, items))
+
+    per_file_seconds: Optional[float] = None
+    batch_sizes: List[int] = []
+    busy_time = defaultdict(float)
     results = []
-    for i in range(0, len(batches), wave_size):
-        wave = batches[i:i+wave_size]
-        tasks = [loop.run_in_executor(executor, process_batch, b) for b in wave]
-        res = await asyncio.gather(*tasks)
-        results.extend(res)
-        await asyncio.sleep(0)  # Yield control
-    return results
-
-async def search_skills_multiprocessing(skills: List[str], db: Session):
+    pending = set()
+    peak_in_flight = 0
+    started = time.perf_counter()
+
+    try:
+        while queue or pending:
+            while queue and len(pending) < max_in_flight:
+                size = next_batch_size(per_file_seconds, len(queue), workers)
+                batch = [queue.popleft() for _ in range(size)]
+                pending.add(submit(loop, process_batch, batch, skills, require_all))
+                batch_sizes.append(size)
+            peak_in_flight = max(peak_in_flight, _in_flight)
+
+            done, pending = await asyncio.wait(pending, timeout=progress_interval,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            finished, files = [], 0
+            for future in done:
+                outcome = future.result()
+                results.append(outcome["results"])
+                finished.extend(outcome["results"])
+                files += outcome["files"]
+                busy_time[outcome["worker_pid"]] += outcome["busy_time"]
+                observed = outcome["busy_time"] / max(1, outcome["files"])
+                per_file_seconds = observed if per_file_seconds is None else (
+                    PARSE_TIME_SMOOTHING * observed + (1 - PARSE_TIME_SMOOTHING) * per_file_seconds)
+            if on_progress is not None and not await on_progress(finished, files):
+                logger.info(f"Stopped with {len(queue) + len(pending)} batches of work left")
+                break
+    finally:
+        # Batches already running finish in their worker, queued ones are dropped
+        for future in pending:
+            future.cancel()
+
+    wall_time = time.perf_counter() - started
+    stats = {
+        "number_of_batches": len(batch_sizes),
+        "batch_size_min": min(batch_sizes, default=0),
+        "batch_size_max": max(batch_sizes, default=0),
+        "per_file_seconds": round(per_file_seconds or 0.0, 4),
+        "peak_in_flight_batches": peak_in_flight,
+        "worker_utilization": {
+            str(pid): round(busy / wall_time, 2) if wall_time else 0.0
+            for pid, busy in sorted(busy_time.items())
+        },
+    }
+    return results, stats
+
+def plan_search(skills: List[str], db: Session, match_all: bool = False) -> Tuple[List[WorkItem], Dict[int, List[int]]]:
+    """
+    Work items for the index candidates of a search, one per distinct content, and the
+    ids of the skipped duplicates keyed by the id of the PDF processed in their place
+    """
+    skill_index.sync(db)
+    matches, _ = skill_index.search(skills, match_all=match_all)
+
+    # Stream lightweight work items instead of loading and pickling ORM objects
+    items: List[WorkItem] = []
+    # Identical uploads share a content hash, only one of them is processed
+    duplicates = defaultdict(list)
+    if matches:
+        query = (db.query(PDF.id, PDF.filepath, PDF.filename, PDF.content_hash)
+                 .filter(PDF.is_deleted == False)
+                 .filter(PDF.ingestion_status == Status.SUCCESS.value)
+                 .filter(PDF.id.in_(matches.keys()))
+                 .yield_per(STREAM_CHUNK_SIZE))
+        first_by_hash = {}
+        for pdf_id, filepath, filename, content_hash in query:
+            if content_hash in first_by_hash:
+                duplicates[first_by_hash[content_hash]].append(pdf_id)
+                continue
+            if content_hash is not None:
+                first_by_hash[content_hash] = pdf_id
+            items.append((pdf_id, filepath, filename))
+    return items, duplicates
+
+def expand_duplicates(results: List[dict], duplicates: Dict[int, List[int]]) -> List[dict]:
+    """
+    Copy each result to the duplicates of its document
+    """
+    expanded = []
+    for result in results:
+        expanded.append(result)
+        expanded.extend({**result, "pdf_id": pdf_id} for pdf_id in duplicates.get(result["pdf_id"], []))
+    return expanded
+
+async def search_skills_multiprocessing(skills: List[str], db: Session, match_all: bool = False):
     start_time = time.time()
     logger.info(f"Starting batch multiprocessing skill search for skills: {skills}")
-    
-    pdfs = db.query(PDF).filter(PDF.is_deleted == False).all()
-    logger.info(f"Found {len(pdfs)} PDFs to search through")
-    
-    pdf_data = [(pdf, skills) for pdf in pdfs]
-    
-    # Calculate optimal number of workers and batch size
-    max_workers = min(4, cpu_count())
-    batch_size = 5  # Changed to 5 as requested
-    
-    # Create batches
-    batches = []
-    for i in range(0, len(pdf_data), batch_size):
-        batch = pdf_data[i:i + batch_size]
-        batches.append(batch)
-    
-    logger.info(f"Created {len(batches)} batches with {batch_size} PDFs per batch")
-    
-    # Process batches in waves
+    pool_at_start = pool_stats()
+
+    items, duplicates = await run_blocking(plan_search, skills, db, match_all)
+    total_pdfs = len(items) + sum(len(ids) for ids in duplicates.values())
+    logger.info(f"Scheduling {len(items)} unique candidate PDFs out of {total_pdfs} on the process pool")
+
     loop = asyncio.get_running_loop()
-    
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        batch_results = await process_in_waves(executor, loop, batches)
+    batch_results, scheduler = await process_adaptively(loop, items, skills, match_all)
     
     # Flatten results from all batches
-    valid_results = [item for batch in batch_results for item in batch]
+    valid_results = expand_duplicates([result for batch in batch_results for result in batch], duplicates)
     
     time_taken = round(time.time() - start_time, 2)
     logger.info(f"Batch processing completed. {len(valid_results)} matches found in {time_taken} seconds.")
     
     # Calculate average read time
-    read_times = [r.get('read_time', 0) for r in valid_results]
+    read_times = [r["timing"]["read_time"] for r in valid_results]
     avg_read_time = round(sum(read_times) / len(read_times) if read_times else 0, 2)
     
     return {
         "results": valid_results,
         "time_taken_seconds": time_taken,
-        "total_pdfs_processed": len(pdfs),
-        "number_of_batches": len(batches),
-        "average_pdf_read_time": avg_read_time
-    } 
\ No newline at end of file
+        "total_pdfs_processed": total_pdfs,
+        "unique_documents_processed": len(items),
+        "number_of_batches": scheduler["number_of_batches"],
+        "average_pdf_read_time": avg_read_time,
+        "timing": {
+            "total_time": time_taken,
+            "pool": {
+                "workers": _pool_size,
+                "in_flight_batches_at_start": pool_at_start["in_flight_batches"],
+                "peak_in_flight_batches": scheduler["peak_in_flight_batches"],
+                "peak_saturation": round(scheduler["peak_in_flight_batches"] / _pool_size, 2) if _pool_size else 0.0,
+            },
+            "scheduler": scheduler
+        }
+    }
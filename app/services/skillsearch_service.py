@@ -1,49 +1,120 @@
+import heapq
 import time
-import re
-from typing import List
+from typing import Dict, Optional
 from sqlalchemy.orm import Session
 from app.models import PDF
-from app.utils import read_pdf_text, extract_name, extract_email
+from app.utils import extract_name, extract_email, encode_cursor, decode_cursor
 from app.logger import logger
+from app.services import packed_corpus, profile_service
+from app.services.skill_index import ScoredMatch, skill_index, verify_long_skills
+from app.services.skill_query import SkillQuery
+from app.status import Status
+from app.utilsp.streaming import collect_results, run_blocking
 
-async def search_skills(skills: List[str], db: Session):
-    start_time = time.time()
-    logger.info(f"Starting skill search for skills: {skills}")
-    results = []
-
-    pdfs = db.query(PDF).filter(PDF.is_deleted == False).all()
-    logger.info(f"Found {len(pdfs)} PDFs to search through")
-
-    for pdf in pdfs:
-        try:
-            logger.info(f"Processing PDF: {pdf.filename}")
-            text = read_pdf_text(pdf.filepath)
-            if not text:
-                logger.warning(f"No text extracted from PDF: {pdf.filename}")
+DEFAULT_LIMIT = 20
+CURSOR_FIELDS = ("score", "id")
+
+def decode_search_cursor(cursor: str) -> dict:
+    """
+    Position of a skill search cursor, raises ValueError unless it holds a numeric score and id
+    """
+    position = decode_cursor(cursor, CURSOR_FIELDS)
+    try:
+        return {"score": float(position["score"]), "id": int(position["id"])}
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+def _rank_key(item):
+    # Best score first, lower id first among equal scores. Cursors carry the same two values.
+    doc_id, match = item
+    return match.score, -doc_id
+
+def top_k(scored: Dict[int, ScoredMatch], k: int, after: Optional[dict] = None):
+    """
+    The k best matches ranked below the cursor position, selected with a bounded heap
+    """
+    candidates = scored.items()
+    if after is not None:
+        position = (after["score"], -after["id"])
+        candidates = (item for item in candidates if _rank_key(item) < position)
+    return heapq.nlargest(k, candidates, key=_rank_key)
+
+def _score(query: SkillQuery, db: Session):
+    skill_index.sync(db)
+    return skill_index.rank(query)
+
+
+def _load_page(page, unverified, query: SkillQuery, db: Session):
+    page_ids = [doc_id for doc_id, _ in page]
+    pdfs = {pdf.id: pdf for pdf in (db.query(PDF)
+                                    .filter(PDF.is_deleted == False)
+                                    .filter(PDF.ingestion_status == Status.SUCCESS.value)
+                                    .filter(PDF.id.in_(page_ids))
+                                    .all())}
+
+    # Contact details come from the stored profiles. Text is only loaded for long-phrase
+    # checks and for documents ingested before profiles existed.
+    profiles = profile_service.get_profiles((pdf.content_hash for pdf in pdfs.values()), db)
+    needs_text = [pdf for pdf in pdfs.values() if unverified or pdf.content_hash not in profiles]
+    texts = packed_corpus.load_pdf_texts(needs_text, db) if needs_text else {}
+    verified = verify_long_skills({doc_id: match.matched_skills for doc_id, match in page}, unverified, texts,
+                                  required=query.required)
+    return pdfs, profiles, texts, verified
+
+
+async def iter_search_skills(query: SkillQuery, db: Session, limit: int = DEFAULT_LIMIT, after: Optional[dict] = None):
+    """
+    Yield the `limit` best matching PDFs ranked below `after` (a decoded cursor), best first.
+    Candidates are scored from the index and only the selected ones are loaded.
+    Index sync, scoring and page loads run in a thread, a deadline can stop the search between them.
+    """
+    scored, unverified = await run_blocking(_score, query, db)
+    logger.info(f"Index scored {len(scored)} candidate PDFs out of {len(skill_index)}")
+
+    emitted = 0
+    while emitted < limit:
+        page = top_k(scored, limit - emitted, after)
+        if not page:
+            break
+        pdfs, profiles, texts, verified = await run_blocking(_load_page, page, unverified, query, db)
+
+        for doc_id, match in page:
+            pdf = pdfs.get(doc_id)
+            matched_skills = verified.get(doc_id)
+            if pdf is None or not matched_skills:
                 continue
+            profile = profiles.get(pdf.content_hash)
+            text = texts.get(doc_id, "")
+            emitted += 1
+            yield {
+                "name": profile.name if profile else extract_name(text),
+                "email": profile.email if profile else extract_email(text),
+                "pdf_id": doc_id,
+                "matched_skills": matched_skills,
+                "score": round(match.score, 4),
+                "cursor": encode_cursor({"score": match.score, "id": doc_id}),
+            }
+
+        last_id, last_match = page[-1]
+        after = {"score": last_match.score, "id": last_id}
+
+async def search_skills(query: SkillQuery, db: Session, deadline_ms: Optional[int] = None,
+                        limit: int = DEFAULT_LIMIT, after: Optional[dict] = None):
+    start_time = time.time()
+    logger.info(f"Starting skill search for skills: {list(query.skills)}")
 
-            matched_skills = [skill for skill in skills if re.search(rf'\b{re.escape(skill)}\b', text, re.IGNORECASE)]
-            logger.info(f"Found {len(matched_skills)} matching skills in {pdf.filename}: {matched_skills}")
-            
-            if matched_skills:
-                name = extract_name(text)
-                email = extract_email(text)
-                logger.info(f"Extracted details from {pdf.filename} - Name: {name}, Email: {email}")
-                
-                results.append({
-                    "name": name,
-                    "email": email,
-                    "pdf_id": pdf.id,
-                    "matched_skills": matched_skills
-                })
-        except Exception as e:
-            logger.error(f"Error processing PDF {pdf.filename}: {str(e)}")
-            continue
+    # One extra result tells whether there is a next page
+    results, complete = await collect_results(iter_search_skills(query, db, limit=limit + 1, after=after),
+                                              deadline_ms)
+    has_more = len(results) > limit
+    results = results[:limit]
 
     end_time = time.time()
     time_taken = round(end_time - start_time, 2)
     logger.info(f"Skill search completed. Found {len(results)} matches. Time taken: {time_taken} seconds")
     return {
         "results": results,
-        "time_taken_seconds": time_taken
-    } 
\ No newline at end of file
+        "next_cursor": results[-1]["cursor"] if has_more else None,
+        "time_taken_seconds": time_taken,
+        "complete": complete
+    }
@@ -0,0 +1,148 @@
+import hashlib
+import os
+from typing import Dict, Iterable, List, Union
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.models import PDF, Resume, DocumentText
+from app.utils import read_pdf_text
+
+# Bump this whenever the extractor (or how its output is post-processed) changes,
+# so cached texts produced by the old extractor are re-parsed on next access.
+EXTRACTOR_VERSION = "pdfminer-1"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Anything with filepath, filename, content_hash and file_mtime columns
+Document = Union[PDF, Resume]
+
+
+def extract_document_text(file_path: str) -> str:
+    """
+    Run the extractor that EXTRACTOR_VERSION refers to
+    """
+    return read_pdf_text(file_path)
+
+
+def compute_content_hash(file_path: str) -> str:
+    """
+    SHA-256 hex digest of a file on disk, read in chunks
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def refresh_content_hash(pdf: Document) -> bool:
+    """
+    Re-hash the file if it is new to the store or changed on disk since it was last hashed.
+    Returns True when the stored hash was updated.
+    """
+    try:
+        mtime = os.path.getmtime(pdf.filepath)
+    except OSError:
+        logger.warning(f"File missing on disk: {pdf.filepath}")
+        return False
+
+    if pdf.content_hash and pdf.file_mtime == mtime:
+        return False
+
+    pdf.content_hash = compute_content_hash(pdf.filepath)
+    pdf.file_mtime = mtime
+    return True
+
+
+def store_texts(texts: Dict[str, str], db: Session) -> None:
+    """
+    Persist extracted texts keyed by content hash. Existing entries are left untouched.
+    """
+    if not texts:
+        return
+    # Postgres text columns reject NUL bytes, which some extractors emit
+    stmt = insert(DocumentText).values([
+        {
+            "content_hash": content_hash,
+            "extractor_version": EXTRACTOR_VERSION,
+            "extracted_text": text.replace("\x00", ""),
+        } for content_hash, text in texts.items()
+    ]).on_conflict_do_nothing(constraint="uq_document_text_version")
+    db.execute(stmt)
+    db.commit()
+
+
+def store_text(content_hash: str, text: str, db: Session) -> None:
+    store_texts({content_hash: text}, db)
+
+
+def get_document(content_hash: str, db: Session) -> DocumentText | None:
+    return (db.query(DocumentText)
+            .filter(DocumentText.content_hash == content_hash)
+            .filter(DocumentText.extractor_version == EXTRACTOR_VERSION)
+            .first())
+
+
+def get_cached_texts(pdfs: Iterable[Document], db: Session) -> Dict[int, str]:
+    """
+    Return {id: text} for every PDF or resume whose current content already has a stored text.
+    Documents that are missing from the result need to be extracted by the caller.
+    """
+    pdfs = list(pdfs)
+    changed = [refresh_content_hash(pdf) for pdf in pdfs]
+    if any(changed):
+        db.commit()
+
+    hashes = {pdf.content_hash for pdf in pdfs if pdf.content_hash}
+    if not hashes:
+        return {}
+
+    rows = (db.query(DocumentText.content_hash, DocumentText.extracted_text)
+            .filter(DocumentText.content_hash.in_(hashes))
+            .filter(DocumentText.extractor_version == EXTRACTOR_VERSION)
+            .all())
+    by_hash = {content_hash: text for content_hash, text in rows}
+    return {pdf.id: by_hash[pdf.content_hash] for pdf in pdfs if pdf.content_hash in by_hash}
+
+
+def load_texts(pdfs: Iterable[Document], db: Session) -> Dict[int, str]:
+    """
+    Return {id: text} for the given PDFs or resumes, extracting and storing only the cache misses
+    """
+    pdfs = list(pdfs)
+    texts = get_cached_texts(pdfs, db)
+
+    extracted = {}
+    for pdf in pdfs:
+        if pdf.id in texts or not pdf.content_hash:
+            continue
+        if pdf.content_hash not in extracted:
+            logger.info(f"Text cache miss for {pdf.filename}, extracting")
+            extracted[pdf.content_hash] = extract_document_text(pdf.filepath)
+        texts[pdf.id] = extracted[pdf.content_hash]
+
+    store_texts(extracted, db)
+    return texts
+
+
+def backfill_texts(db: Session, model=PDF, batch_size: int = 50) -> int:
+    """
+    Extract and store texts for all existing PDFs (or resumes) that are not cached yet.
+    Returns the number of documents processed.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        query = db.query(model).filter(model.id > last_id)
+        if model is PDF:
+            query = query.filter(PDF.is_deleted == False)
+        batch: List[Document] = query.order_by(model.id).limit(batch_size).all()
+        if not batch:
+            break
+        load_texts(batch, db)
+        processed += len(batch)
+        last_id = batch[-1].id
+        logger.info(f"Backfilled texts for {processed} rows of {model.__tablename__}")
+    return processed
@@ -0,0 +1,22 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.models import Post, Vote
+
+
+def reconcile_vote_counts(db: Session) -> int:
+    """
+    Reset posts.vote_count to the number of votes rows wherever the two drifted apart,
+    e.g. after a deleted user took their votes along. Returns the number of posts repaired.
+    """
+    counted = (db.query(func.count(Vote.post_id))
+               .filter(Vote.post_id == Post.id)
+               .scalar_subquery())
+    repaired = (db.query(Post)
+                .filter(Post.vote_count != counted)
+                .update({Post.vote_count: counted}, synchronize_session=False))
+    db.commit()
+    if repaired:
+        logger.warning(f"Repaired the vote counts of {repaired} posts")
+    return repaired
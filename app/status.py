@@ -5,4 +5,19 @@ class Status(Enum):
     SUCCESS = "SUCCESS"
     FAILURE = "FAILURE"
     PENDING = "PENDING"
-    NOT_STARTED = "NOT_STARTED"
\ No newline at end of file
+    NOT_STARTED = "NOT_STARTED"
+
+class JobStatus(Enum):
+
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCESS = "SUCCESS"
+    FAILURE = "FAILURE"
+
+class SearchJobStatus(Enum):
+
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCESS = "SUCCESS"
+    FAILURE = "FAILURE"
+    CANCELLED = "CANCELLED"
@@ -1,5 +1,9 @@
 from passlib.context import CryptContext
 import re
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
 from pdfminer.high_level import extract_text
 
 
@@ -28,6 +32,57 @@ def extract_name(text: str) -> str:
     lines = text.strip().split('\n')
     return lines[0] if lines else ""
 
+# Words keep inner dots and trailing +/# so "node.js", "c++" and "c#" stay single tokens
+TOKEN_PATTERN = re.compile(r"\w[\w+#]*(?:\.\w+)*")
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.casefold())
+
+def normalize_skill(skill: str) -> tuple[str, ...]:
+    return tuple(tokenize(skill))
+
+def encode_cursor(position: dict) -> str:
+    """
+    Opaque paging token for the position of the last item a client has seen
+    """
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, fields: tuple = ()) -> dict:
+    """
+    Inverse of encode_cursor, raises ValueError unless every one of `fields` is present
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict) or any(field not in position for field in fields):
+        raise ValueError("Invalid cursor")
+    return position
+
+# List endpoints keep returning plain arrays, the cursor of the next page travels in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def keyset_page(query, model, limit: int, cursor: str | None = None, offset: int = 0):
+    """
+    One page of `query`, newest first by (model.created_at, model.id), starting after the
+    row `cursor` points at. The row comparison lets Postgres seek a (created_at, id) index,
+    so every page costs the same however deep it is. Returns the rows and the cursor of the
+    next page, None on the last one. Raises ValueError for a malformed cursor.
+    """
+    if cursor:
+        position = decode_cursor(cursor, ("created_at", "id"))
+        try:
+            created_at, row_id = datetime.fromisoformat(position["created_at"]), int(position["id"])
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    # One extra row tells whether another page follows without a second query
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).offset(offset).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor({"created_at": rows[-1].created_at.isoformat(), "id": rows[-1].id})
+
 async def extract_skills(text: str, required_skills: list[str]) -> list[str]:
     found = []
     lower_text = text.lower()
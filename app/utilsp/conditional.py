@@ -0,0 +1,33 @@
+import hashlib
+import json
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong entity tag over whatever identifies a representation's version
+    """
+    digest = hashlib.sha1(json.dumps(parts, default=str, separators=(",", ":")).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match compares weakly, proxies may have weakened our tag when compressing
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def conditional_response(request: Request, body, etag: str, max_age: int,
+                         headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    304 without a body when the client already holds this version, the JSON body otherwise
+    """
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(body, headers=headers)
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi.responses import StreamingResponse
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+async def run_blocking(fn: Callable, *args):
+    """
+    Run blocking work (queries, file reads, hashing) in a thread so the event loop keeps
+    serving. A cancelled caller still waits for the work to finish, so whatever it uses,
+    e.g. the request's session, is free again once the cancellation completes.
+    """
+    work = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    try:
+        return await asyncio.shield(work)
+    except asyncio.CancelledError:
+        await asyncio.wait({work})
+        raise
+
+
+async def iter_until_deadline(results: AsyncIterator[dict], deadline_ms: Optional[int]):
+    """
+    Yield (result, None) for every result produced before the deadline, then a final
+    (None, complete) telling whether the search ran to the end.
+    The deadline holds as long as the producer does its blocking work through run_blocking
+    or the process pool. Closing this generator cancels the producer's step in flight.
+    """
+    deadline = None if deadline_ms is None else time.monotonic() + deadline_ms / 1000
+    step = None
+    try:
+        while True:
+            step = asyncio.ensure_future(results.__anext__())
+            done, _ = await asyncio.wait({step}, timeout=_remaining(deadline))
+            if not done:
+                yield None, False
+                return
+            try:
+                result = step.result()
+            except StopAsyncIteration:
+                yield None, True
+                return
+            yield result, None
+    finally:
+        if step is not None and not step.done():
+            step.cancel()
+            await asyncio.wait({step})
+        await results.aclose()
+
+
+async def collect_results(results: AsyncIterator[dict], deadline_ms: Optional[int] = None) -> tuple[list, bool]:
+    collected = []
+    complete = True
+    async with aclosing(iter_until_deadline(results, deadline_ms)) as items:
+        async for result, done in items:
+            if result is None:
+                complete = done
+                break
+            collected.append(result)
+    return collected, complete
+
+
+def _encode(kind: str, payload: dict, fmt: str) -> str:
+    if fmt == "sse":
+        return f"event: {kind}\ndata: {json.dumps(payload, default=str)}\n\n"
+    return json.dumps({"type": kind, **payload}, default=str) + "\n"
+
+
+def stream_results(results: AsyncIterator[dict], fmt: str = "ndjson", deadline_ms: Optional[int] = None,
+                   on_close: Optional[Callable[[], None]] = None) -> StreamingResponse:
+    """
+    Stream each match as soon as it is found (NDJSON lines or Server-Sent Events),
+    finishing with a summary record that says whether the results are complete
+    """
+    async def body():
+        start_time = time.time()
+        count = 0
+        try:
+            # Closed before on_close runs, the producer may still be using the stream's session
+            async with aclosing(iter_until_deadline(results, deadline_ms)) as items:
+                async for result, complete in items:
+                    if result is None:
+                        yield _encode("summary", {
+                            "total_results": count,
+                            "complete": complete,
+                            "time_taken_seconds": round(time.time() - start_time, 2),
+                        }, fmt)
+                        break
+                    count += 1
+                    yield _encode("match", result, fmt)
+        finally:
+            if on_close is not None:
+                on_close()
+
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[fmt])
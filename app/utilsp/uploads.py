@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List
+from uuid import uuid4
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+from app.logger import logger
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of each accepted file type, keyed by the extension stored on disk
+PDF_SIGNATURES = {".pdf": b"%PDF-"}
+# Resume texts are read by the PDF extractor, Word files would be stored but never matched
+RESUME_SIGNATURES = PDF_SIGNATURES
+
+
+@dataclass
+class SavedUpload:
+    filepath: str
+    filename: str
+    content_hash: str
+    size: int
+
+
+def detect_type(head: bytes, signatures: Dict[str, bytes]) -> str | None:
+    for ext, magic in signatures.items():
+        if head.startswith(magic):
+            return ext
+    return None
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def stream_upload_to_disk(file: UploadFile, upload_dir: str, signatures: Dict[str, bytes],
+                                max_bytes: int | None = None) -> SavedUpload:
+    """
+    Write an upload to disk in fixed-size chunks, hashing it in the same pass.
+    The file type is checked from the magic bytes of the first chunk and the size
+    limit as the bytes arrive, so invalid or oversized uploads stop right away
+    and only one chunk is held in memory.
+    """
+    max_bytes = max_bytes or settings.max_upload_bytes
+    head = await file.read(UPLOAD_CHUNK_SIZE)
+    ext = detect_type(head, signatures)
+    if ext is None:
+        logger.warning(f"Rejected upload {file.filename}: unsupported file type")
+        raise HTTPException(status_code=400, detail=f"Unsupported file type, expected one of {sorted(signatures)}")
+
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    unique_filename = f"{uuid4().hex}_{timestamp}{ext}"
+    file_path = os.path.join(upload_dir, unique_filename)
+
+    digest = hashlib.sha256()
+    size = 0
+    chunk = head
+    try:
+        async with aiofiles.open(file_path, "wb") as f:
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes} byte upload limit")
+                digest.update(chunk)
+                await f.write(chunk)
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        _remove(file_path)
+        logger.warning(f"Aborted upload {file.filename} after {size} bytes")
+        raise
+
+    logger.info(f"Saved upload {file.filename} to {file_path} ({size} bytes)")
+    return SavedUpload(filepath=file_path, filename=unique_filename, content_hash=digest.hexdigest(), size=size)
+
+
+async def stream_uploads_to_disk(files: List[UploadFile], upload_dir: str, signatures: Dict[str, bytes],
+                                 concurrency: int | None = None) -> List[SavedUpload | Exception]:
+    """
+    Save several uploads concurrently, at most `concurrency` at a time.
+    Returns one entry per file in order, the SavedUpload or the error that rejected it.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.upload_concurrency)
+
+    async def save(file: UploadFile) -> SavedUpload:
+        async with semaphore:
+            return await stream_upload_to_disk(file, upload_dir, signatures)
+
+    return await asyncio.gather(*(save(file) for file in files), return_exceptions=True)
+
+
+def upload_error(error: Exception) -> str:
+    return error.detail if isinstance(error, HTTPException) else str(error)
@@ -0,0 +1,100 @@
+"""
+Job worker, run one or more of these next to the API:
+
+    python -m app.worker
+"""
+import argparse
+import os
+import signal
+import socket
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.logger import logger
+from app.services import job_queue_service, resume_service
+
+
+@dataclass
+class JobHandler:
+    run: Callable[[dict, Session], None]
+    # Called once a job has used up all of its attempts
+    on_give_up: Optional[Callable[[dict, Session], None]] = None
+
+
+HANDLERS: Dict[str, JobHandler] = {
+    resume_service.PROCESS_RESUME_JOB: JobHandler(
+        run=resume_service.run_process_resume_job,
+        on_give_up=resume_service.mark_resume_failed,
+    ),
+}
+
+
+class Worker:
+    def __init__(self, batch_size: int = 1, poll_interval: float = None):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval if poll_interval is not None else settings.job_poll_interval_seconds
+        self.stopping = False
+
+    def stop(self, *_):
+        logger.info(f"Worker {self.worker_id} stopping after the current job")
+        self.stopping = True
+
+    def give_up_expired(self, db: Session) -> None:
+        for job in job_queue_service.expire_exhausted(db):
+            handler = HANDLERS.get(job.kind)
+            if handler is not None and handler.on_give_up:
+                handler.on_give_up(job.payload, db)
+
+    def run_once(self, db: Session) -> int:
+        self.give_up_expired(db)
+        jobs = job_queue_service.claim(db, self.worker_id, limit=self.batch_size)
+        for job in jobs:
+            handler = HANDLERS.get(job.kind)
+            if handler is None:
+                job_queue_service.fail(job, self.worker_id, f"No handler for job kind {job.kind}", db)
+                continue
+            started = time.perf_counter()
+            try:
+                handler.run(job.payload, db)
+                if not job_queue_service.complete(job, self.worker_id, db):
+                    continue
+                logger.info(f"Job {job.id} ({job.kind}) done in {time.perf_counter() - started:.2f}s")
+            except Exception as e:
+                db.rollback()
+                if not job_queue_service.fail(job, self.worker_id, str(e), db) and handler.on_give_up:
+                    handler.on_give_up(job.payload, db)
+        return len(jobs)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"Worker {self.worker_id} started, handling {sorted(HANDLERS)}")
+        while not self.stopping:
+            db = SessionLocal()
+            try:
+                claimed = self.run_once(db)
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} loop error: {e}")
+                claimed = 0
+            finally:
+                db.close()
+            if not claimed:
+                time.sleep(self.poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.worker")
+    parser.add_argument("--batch-size", type=int, default=1, help="Jobs claimed per poll")
+    parser.add_argument("--poll-interval", type=float, default=None, help="Seconds to sleep when the queue is empty")
+    args = parser.parse_args()
+    Worker(batch_size=args.batch_size, poll_interval=args.poll_interval).run()
+
+
+if __name__ == "__main__":
+    main()
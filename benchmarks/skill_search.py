@@ -0,0 +1,337 @@
+"""
+Offline benchmark of the skill search engines over the bundled resume corpus.
+
+    python -m benchmarks.skill_search
+    python -m benchmarks.skill_search --sizes 550 5000 50000 --skill-counts 1 3 10 --engines index
+
+Engines, each run on its document-level core without a database or web server:
+
+    index            SkillIndex BM25 ranking + top-k (skillsearch_service.search_skills)
+    multiprocessing  PyMuPDF read + skill match per file on a process pool
+                     (skillsearch_multiprocessing_service.search_skills_multiprocessing)
+    sequential       pdfminer read + skill match per file in one process
+                     (resume_service.parse_resumes_without_multiprocessing)
+
+Sizes above the number of unique files replicate the corpus. The file-based engines
+re-read every file on each query, so they are capped by --max-file-docs.
+Results are written as JSON to benchmarks/results/ unless --output is given.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+# The engines are imported through the app package, whose settings insist on
+# database credentials. Nothing here connects, so placeholders are enough.
+for _name in ("DATABASE_HOSTNAME", "DATABASE_PORT", "DATABASE_USERNAME", "DATABASE_PASSWORD", "DATABASE_NAME",
+              "SECRET_KEY", "ALGORITHM", "ACCESS_TOKEN_EXPIRE_MINUTES", "RAZORPAY_KEY_ID", "RAZORPAY_KEY_SECRET",
+              "RAZORPAY_WEBHOOK_SECRET"):
+    os.environ.setdefault(_name, "0" if _name in ("DATABASE_PORT", "ACCESS_TOKEN_EXPIRE_MINUTES") else "benchmark")
+
+from app.services.profile_service import SKILL_VOCABULARY
+from app.services.skill_index import SkillIndex, verify_long_skills
+from app.services.skill_matcher import match_skills
+from app.services.skill_query import parse_skill_query
+from app.services.skillsearch_multiprocessing_service import scan_pdf
+from app.services.skillsearch_service import DEFAULT_LIMIT, top_k
+from app.services.text_store_service import extract_document_text
+
+CORPUS_DIRS = ["pdfs", "resumes", "multiple_resumes"]
+DEFAULT_SIZES = [100, 550, 5000, 50000]
+DEFAULT_SKILL_COUNTS = [1, 3, 10]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class RssSampler:
+    """
+    Peak resident set size of this process while the block runs, sampled from /proc
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(seconds: List[float]) -> dict:
+    return {
+        "p50_ms": round(percentile(seconds, 50) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 2),
+        "mean_ms": round(sum(seconds) / len(seconds) * 1000, 2) if seconds else 0.0,
+        "max_ms": round(max(seconds, default=0.0) * 1000, 2),
+    }
+
+
+def discover_corpus(dirs: List[str]) -> List[str]:
+    files = []
+    for directory in dirs:
+        if os.path.isdir(directory):
+            files.extend(sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                                if name.lower().endswith(".pdf")))
+    return files
+
+
+def replicate(items: list, size: int) -> list:
+    return [items[i % len(items)] for i in range(size)] if items else []
+
+
+def skill_lists(count: int, queries: int, seed: int) -> List[List[str]]:
+    rng = random.Random(f"{seed}-{count}")
+    return [rng.sample(SKILL_VOCABULARY, min(count, len(SKILL_VOCABULARY))) for _ in range(queries)]
+
+
+# ---- document-level cores, kept at module level so the pool can pickle them ----
+
+def _scan_file(filepath: str, skills: List[str], reader: Callable[[str], str]) -> tuple:
+    started = time.perf_counter()
+    text = reader(filepath)
+    read = time.perf_counter() - started
+    matched = match_skills(skills, text) if text else []
+    return read, time.perf_counter() - started - read, bool(matched)
+
+
+def _scan_batch(files: List[str], skills: List[str]) -> tuple:
+    # Same page-lazy scan as the service: reading and matching are interleaved page by page,
+    # so they are only timed together
+    scan = 0.0
+    hits = 0
+    for filepath in files:
+        started = time.perf_counter()
+        try:
+            matched, _, _ = scan_pdf(filepath, skills)
+        except Exception:
+            matched = []
+        scan, hits = scan + time.perf_counter() - started, hits + bool(matched)
+    return scan, hits
+
+
+def extract_texts(files: List[str], workers: int) -> Dict[str, str]:
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(files, pool.map(extract_document_text, files, chunksize=8)))
+
+
+# ---- engines ----
+
+def bench_index(texts: List[str], skill_sets: List[List[str]], limit: int) -> dict:
+    index = SkillIndex()
+    started = time.perf_counter()
+    for doc_id, text in enumerate(texts, start=1):
+        index.add_document(doc_id, text)
+    build = time.perf_counter() - started
+
+    latencies = []
+    stages = {"rank_s": 0.0, "top_k_s": 0.0, "verify_s": 0.0}
+    matches = 0
+    for skills in skill_sets:
+        query = parse_skill_query(skills)
+        t0 = time.perf_counter()
+        scored, unverified = index.rank(query)
+        t1 = time.perf_counter()
+        page = top_k(scored, limit)
+        t2 = time.perf_counter()
+        verify_long_skills({doc_id: match.matched_skills for doc_id, match in page}, unverified,
+                           {doc_id: texts[doc_id - 1] for doc_id, _ in page}, required=query.required)
+        t3 = time.perf_counter()
+        stages["rank_s"] += t1 - t0
+        stages["top_k_s"] += t2 - t1
+        stages["verify_s"] += t3 - t2
+        latencies.append(t3 - t0)
+        matches += len(scored)
+
+    return {
+        "latencies": latencies,
+        "stages": {"index_build_s": build, **stages},
+        "documents_scanned_per_query": len(texts),
+        "mean_matches": matches / len(skill_sets) if skill_sets else 0,
+    }
+
+
+def bench_multiprocessing(files: List[str], skill_sets: List[List[str]], workers: int, batch_size: int) -> dict:
+    latencies = []
+    stages = {"scan_s": 0.0}
+    matches = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Warm the workers so pool start-up is not billed to the first query
+        list(pool.map(abs, range(workers)))
+        for skills in skill_sets:
+            batches = [files[i:i + batch_size] for i in range(0, len(files), batch_size)]
+            started = time.perf_counter()
+            for scan, hits in pool.map(_scan_batch, batches, [skills] * len(batches)):
+                stages["scan_s"] += scan
+                matches += hits
+            latencies.append(time.perf_counter() - started)
+    return {
+        "latencies": latencies,
+        "stages": stages,
+        "documents_scanned_per_query": len(files),
+        "mean_matches": matches / len(skill_sets) if skill_sets else 0,
+    }
+
+
+def bench_sequential(files: List[str], skill_sets: List[List[str]]) -> dict:
+    latencies = []
+    stages = {"read_s": 0.0, "match_s": 0.0}
+    matches = 0
+    for skills in skill_sets:
+        started = time.perf_counter()
+        for filepath in files:
+            read, match, hit = _scan_file(filepath, skills, extract_document_text)
+            stages["read_s"] += read
+            stages["match_s"] += match
+            matches += hit
+        latencies.append(time.perf_counter() - started)
+    return {
+        "latencies": latencies,
+        "stages": stages,
+        "documents_scanned_per_query": len(files),
+        "mean_matches": matches / len(skill_sets) if skill_sets else 0,
+    }
+
+
+def run(args) -> dict:
+    files = discover_corpus(args.corpus)
+    if not files:
+        sys.exit(f"No PDFs found in {args.corpus}")
+    print(f"Corpus: {len(files)} files", file=sys.stderr)
+
+    texts_by_file = {}
+    extraction_s = 0.0
+    if "index" in args.engines:
+        started = time.perf_counter()
+        texts_by_file = extract_texts(files, args.workers)
+        extraction_s = time.perf_counter() - started
+        print(f"Extracted text in {extraction_s:.1f}s", file=sys.stderr)
+
+    runs = []
+    for size in args.sizes:
+        for count in args.skill_counts:
+            for engine in args.engines:
+                if engine != "index" and size > args.max_file_docs:
+                    continue
+                queries = args.queries if engine == "index" else args.file_queries
+                skill_sets = skill_lists(count, queries, args.seed)
+                corpus = replicate(files, size)
+                with RssSampler() as rss:
+                    if engine == "index":
+                        outcome = bench_index([texts_by_file[f] for f in corpus], skill_sets, args.limit)
+                    elif engine == "multiprocessing":
+                        outcome = bench_multiprocessing(corpus, skill_sets, args.workers, args.batch_size)
+                    else:
+                        outcome = bench_sequential(corpus, skill_sets)
+
+                latencies = outcome.pop("latencies")
+                total = sum(latencies)
+                result = {
+                    "engine": engine,
+                    "documents": size,
+                    "skills_per_query": count,
+                    "queries": len(latencies),
+                    "queries_per_second": round(len(latencies) / total, 2) if total else None,
+                    "documents_per_second": round(size * len(latencies) / total, 1) if total else None,
+                    "latency": latency_summary(latencies),
+                    "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+                    # Largest pool worker seen so far in this run of the harness
+                    "children_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+                    "stages": {name: round(value, 4) for name, value in outcome.pop("stages").items()},
+                    **{name: round(value, 2) if isinstance(value, float) else value for name, value in outcome.items()},
+                }
+                runs.append(result)
+                print(f"{engine:>15} docs={size:<6} skills={count:<3} p50={result['latency']['p50_ms']}ms "
+                      f"p95={result['latency']['p95_ms']}ms rss={result['peak_rss_mb']}MB", file=sys.stderr)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "unique_files": len(files),
+            "text_extraction_s": round(extraction_s, 2),
+            "seed": args.seed,
+        },
+        "runs": runs,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.skill_search")
+    parser.add_argument("--engines", nargs="+", choices=["index", "multiprocessing", "sequential"],
+                        default=["index", "multiprocessing", "sequential"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Corpus sizes in documents")
+    parser.add_argument("--skill-counts", nargs="+", type=int, default=DEFAULT_SKILL_COUNTS,
+                        help="Skills per query")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per run for the index engine")
+    parser.add_argument("--file-queries", type=int, default=3, help="Queries per run for the file-based engines")
+    parser.add_argument("--max-file-docs", type=int, default=1000,
+                        help="Largest corpus the file-based engines are run on")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Top-k size for the index engine")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=10, help="Files per task for the multiprocessing engine")
+    parser.add_argument("--corpus", nargs="+", default=CORPUS_DIRS, help="Directories holding the PDFs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON file to write, defaults to benchmarks/results/<timestamp>.json")
+    args = parser.parse_args()
+
+    report = run(args)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"skill_search-{datetime.now().strftime('%Y%m%d%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
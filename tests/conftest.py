@@ -4,12 +4,13 @@ from fastapi.testclient import TestClient
 from app import models
 from app.main import app
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from app.config import settings
 from app.database import get_db
 from app.models import Base
 from fastapi import status
 from app.oauth2 import create_access_token
+from app.services import post_cache
 
 SQLALCHEMY_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}_test'
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
@@ -19,6 +20,8 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 def session():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # Cached responses belong to the tables just dropped, their generations start over
+    post_cache.post_cache.clear()
     db = TestingSessionLocal()
     try:
         yield db
@@ -26,6 +29,21 @@ def session():
         db.close()
 
 
+@pytest.fixture()
+def queries():
+    """
+    SQL statements sent to the test database while the test runs
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
 @pytest.fixture()
 def client(session):
 
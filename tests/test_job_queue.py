@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from sqlalchemy import func
+
+from app.models import Job
+from app.services import job_queue_service
+from app.status import JobStatus
+
+
+def expire(job_id, session, field=Job.locked_until):
+    session.query(Job).filter(Job.id == job_id).update({field: func.now() - timedelta(seconds=1)},
+                                                       synchronize_session=False)
+    session.commit()
+
+
+def test_claim_hands_each_job_to_one_worker(session):
+    first = job_queue_service.enqueue("test", {"n": 1}, session).id
+    second = job_queue_service.enqueue("test", {"n": 2}, session).id
+
+    claimed = job_queue_service.claim(session, "worker-a")
+    assert [job.id for job in claimed] == [first]
+    assert (claimed[0].status, claimed[0].attempts, claimed[0].locked_by) == (JobStatus.RUNNING, 1, "worker-a")
+
+    assert [job.id for job in job_queue_service.claim(session, "worker-b", limit=5)] == [second]
+    assert job_queue_service.claim(session, "worker-c") == []
+
+
+def test_failed_attempts_back_off_then_give_up(session):
+    job_id = job_queue_service.enqueue("test", {}, session, max_attempts=2).id
+
+    job = job_queue_service.claim(session, "worker")[0]
+    assert job_queue_service.fail(job, "worker", "boom", session) is True
+    job = session.get(Job, job_id)
+    assert job.status == JobStatus.QUEUED
+    assert job.last_error == "boom"
+    # Not runnable again before its backoff delay
+    assert job_queue_service.claim(session, "worker") == []
+
+    expire(job_id, session, Job.run_at)
+    job = job_queue_service.claim(session, "worker")[0]
+    assert job.attempts == 2
+    assert job_queue_service.fail(job, "worker", "boom again", session) is False
+    assert session.get(Job, job_id).status == JobStatus.FAILURE
+
+
+def test_backoff_doubles_with_jitter_up_to_a_cap(monkeypatch):
+    monkeypatch.setattr(job_queue_service.settings, "job_backoff_base_seconds", 5)
+
+    for attempts, base in [(1, 5), (2, 10), (3, 20)]:
+        assert 0.8 * base <= job_queue_service.backoff_seconds(attempts) <= 1.2 * base
+    assert job_queue_service.backoff_seconds(50) <= 1.2 * job_queue_service.MAX_BACKOFF_SECONDS
+
+
+def test_worker_that_lost_its_job_cannot_finish_it(session):
+    job_id = job_queue_service.enqueue("test", {}, session).id
+    stale = job_queue_service.claim(session, "slow-worker")[0]
+
+    # The visibility timeout passes and another worker takes the job over
+    expire(job_id, session)
+    current = job_queue_service.claim(session, "other-worker")[0]
+
+    assert job_queue_service.complete(stale, "slow-worker", session) is False
+    assert job_queue_service.fail(stale, "slow-worker", "late error", session) is True
+    job = session.get(Job, job_id)
+    assert (job.status, job.locked_by, job.last_error) == (JobStatus.RUNNING, "other-worker", None)
+
+    assert job_queue_service.complete(current, "other-worker", session) is True
+    assert session.get(Job, job_id).status == JobStatus.SUCCESS
+
+
+def test_exhausted_jobs_expire_as_failures(session):
+    job_id = job_queue_service.enqueue("test", {}, session, max_attempts=1).id
+    job_queue_service.claim(session, "worker")
+    expire(job_id, session)
+
+    assert job_queue_service.claim(session, "worker") == []
+    assert [job.id for job in job_queue_service.expire_exhausted(session)] == [job_id]
+    assert session.get(Job, job_id).status == JobStatus.FAILURE
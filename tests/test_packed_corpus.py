@@ -0,0 +1,37 @@
+from app.services.packed_corpus import PackedCorpus
+
+
+def test_appends_are_seen_by_another_reader(tmp_path):
+    writer = PackedCorpus(str(tmp_path))
+    reader = PackedCorpus(str(tmp_path))
+    writer.append(1, "first text")
+    writer.append(2, "zweiter Text, naïve")
+
+    assert reader.get_many([1, 2, 3]) == {1: "first text", 2: "zweiter Text, naïve"}
+
+    # A later record for the same document replaces the earlier one
+    writer.append(1, "first text, re-extracted")
+    assert reader.get(1) == "first text, re-extracted"
+    assert reader.ids() == {1, 2}
+
+
+def test_compaction_moves_readers_to_the_new_generation(tmp_path):
+    writer = PackedCorpus(str(tmp_path))
+    reader = PackedCorpus(str(tmp_path))
+    for doc_id in range(1, 5):
+        writer.append(doc_id, f"text {doc_id}")
+    writer.append(2, "text 2, newer")
+    assert reader.ids() == {1, 2, 3, 4}
+    old_generation = reader.stats()["generation"]
+
+    kept, dropped = writer.compact({2, 3})
+
+    assert (kept, dropped) == (2, 2)
+    assert reader.get_many([1, 2, 3, 4]) == {2: "text 2, newer", 3: "text 3"}
+    assert reader.stats()["generation"] == old_generation + 1
+    assert not (tmp_path / f"texts-{old_generation}.bin").exists()
+
+    # Appends after compaction land in the new generation
+    writer.append(5, "text 5")
+    assert reader.get(5) == "text 5"
+    assert PackedCorpus(str(tmp_path)).ids() == {2, 3, 5}
@@ -1,3 +1,8 @@
+from datetime import datetime, UTC
+
+from app import models
+from app.oauth2 import create_access_token
+from app.services import vote_service
 from tests.conftest import authorized_clients
 
 
@@ -7,3 +12,172 @@ def test_get_all_posts(authorized_clients, test_posts):
     assert len(response.json()) == len(test_posts)
     assert response.status_code == 200
 
+
+def test_get_all_posts_single_query(client, session, queries):
+    owner = models.User(email="feed@gmail.com", password="Hello123")
+    session.add(owner)
+    session.commit()
+    posts = [models.Post(title=f"post {i}", content=f"content {i}", owner_id=owner.id) for i in range(10)]
+    session.add_all(posts)
+    session.commit()
+    post_ids = [post.id for post in posts]
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': owner.id})}"}
+    for post_id in post_ids[:3]:
+        assert client.post('/vote/', json={"post_id": post_id, "dir": 1}, headers=headers).status_code == 201
+    # Nothing may be served from the identity map, a lazy owner load would have to hit the database
+    session.expunge_all()
+    queries.clear()
+
+    response = client.get('/posts/', params={"limit": 10})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    assert sorted(post["votes"] for post in response.json()) == [0] * 7 + [1] * 3
+    assert all(post["Post"]["owner"]["email"] == "feed@gmail.com" for post in response.json())
+    # The feed cache generation, then the page itself
+    assert len(queries) == 2, queries
+
+
+def test_top_posts_follow_vote_counts(client, session):
+    voters = [models.User(email=f"voter{i}@gmail.com", password="Hello123") for i in range(3)]
+    session.add_all(voters)
+    session.commit()
+    posts = [models.Post(title=f"post {i}", content=f"content {i}", owner_id=voters[0].id) for i in range(3)]
+    session.add_all(posts)
+    session.commit()
+    post_ids = [post.id for post in posts]
+    tokens = [create_access_token({"user_id": voter.id}) for voter in voters]
+
+    def vote(token, post_id, direction):
+        return client.post('/vote/', json={"post_id": post_id, "dir": direction},
+                           headers={"Authorization": f"Bearer {token}"})
+
+    for token in tokens:
+        assert vote(token, post_ids[1], 1).status_code == 201
+    assert vote(tokens[0], post_ids[1], 1).status_code == 403
+    assert vote(tokens[0], post_ids[2], 1).status_code == 201
+    assert vote(tokens[1], post_ids[2], 1).status_code == 201
+    assert vote(tokens[1], post_ids[2], 0).status_code == 201
+    assert vote(tokens[1], post_ids[2], 0).status_code == 404
+
+    response = client.get('/posts/top', params={"limit": 2})
+
+    assert response.status_code == 200
+    assert [(post["Post"]["id"], post["votes"]) for post in response.json()] == [(post_ids[1], 3), (post_ids[2], 1)]
+
+    session.query(models.Vote).filter(models.Vote.post_id == post_ids[1]).delete()
+    session.commit()
+    assert vote_service.reconcile_vote_counts(session) == 1
+    assert session.query(models.Post.vote_count).filter(models.Post.id == post_ids[1]).scalar() == 0
+
+
+def test_get_all_posts_cursor_walks_every_post_once(client, session):
+    owner = models.User(email="pages@gmail.com", password="Hello123")
+    session.add(owner)
+    session.commit()
+    # Same timestamp for all, the id alone has to keep pages apart
+    created_at = datetime(2026, 1, 1, tzinfo=UTC)
+    session.add_all([models.Post(title=f"post {i}", content=f"content {i}", owner_id=owner.id,
+                                 created_at=created_at) for i in range(7)])
+    session.commit()
+
+    seen, cursor = [], None
+    while True:
+        response = client.get('/posts/', params={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen.extend(post["Post"]["id"] for post in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 7
+    assert client.get('/posts/', params={"cursor": "not-a-cursor"}).status_code == 400
+    cross_origin = client.get('/posts/', params={"limit": 3}, headers={"Origin": "https://admin.example.com"})
+    assert "X-Next-Cursor" in cross_origin.headers["Access-Control-Expose-Headers"]
+
+
+def test_search_posts_ranks_title_matches_first(client, session):
+    owner = models.User(email="search@gmail.com", password="Hello123")
+    session.add(owner)
+    session.commit()
+    session.add_all([
+        models.Post(title="Gardening", content="Notes about databases and indexes", owner_id=owner.id),
+        models.Post(title="Indexing databases", content="How a GIN index works", owner_id=owner.id),
+        models.Post(title="Cooking", content="Nothing relevant here", owner_id=owner.id),
+    ])
+    session.commit()
+
+    first = client.get('/posts/', params={"search": "database index", "limit": 1})
+    second = client.get('/posts/', params={"search": "database index", "limit": 1,
+                                           "cursor": first.headers["X-Next-Cursor"]})
+
+    assert [post["Post"]["title"] for post in first.json()] == ["Indexing databases"]
+    assert [post["Post"]["title"] for post in second.json()] == ["Gardening"]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_get_post_revalidates_until_a_vote_changes_it(client, session, queries):
+    owner = models.User(email="etag@gmail.com", password="Hello123")
+    session.add(owner)
+    session.commit()
+    post = models.Post(title="cached", content="cached content", owner_id=owner.id)
+    session.add(post)
+    session.commit()
+    post_id = post.id
+
+    first = client.get(f'/posts/{post_id}')
+    etag = first.headers["ETag"]
+    queries.clear()
+    repeat = client.get(f'/posts/{post_id}', headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert "max-age" in first.headers["Cache-Control"]
+    assert repeat.status_code == 304
+    assert repeat.headers["ETag"] == etag
+    # Only the post's version is read
+    assert len(queries) == 1, queries
+
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': owner.id})}"}
+    assert client.post('/vote/', json={"post_id": post_id, "dir": 1}, headers=headers).status_code == 201
+    changed = client.get(f'/posts/{post_id}', headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["title"] == "cached"
+
+
+def test_cached_feed_follows_votes_without_eviction(client, session, queries):
+    owner = models.User(email="feedcache@gmail.com", password="Hello123")
+    session.add(owner)
+    session.commit()
+    posts = [models.Post(title=f"post {i}", content=f"content {i}", owner_id=owner.id) for i in range(3)]
+    session.add_all(posts)
+    session.commit()
+    post_ids = [post.id for post in posts]
+
+    first = client.get('/posts/', params={"limit": 3})
+    queries.clear()
+    repeat = client.get('/posts/', params={"limit": 3}, headers={"If-None-Match": first.headers["ETag"]})
+
+    assert repeat.status_code == 304
+    # The feed generation and the versions of the posts on the page
+    assert len(queries) == 2, queries
+
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': owner.id})}"}
+    assert client.post('/vote/', json={"post_id": post_ids[0], "dir": 1}, headers=headers).status_code == 201
+    changed = client.get('/posts/', params={"limit": 3}, headers={"If-None-Match": first.headers["ETag"]})
+
+    assert changed.status_code == 200
+    assert {post["Post"]["id"]: post["votes"] for post in changed.json()}[post_ids[0]] == 1
+
+
+def test_get_all_posts_rejects_unbounded_pages(client, session):
+    owner = models.User(email="pages@gmail.com", password="Hello123")
+    session.add(owner)
+    session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': owner.id})}"}
+
+    for params in ({"limit": 101}, {"limit": 0}, {"offset": -1}):
+        assert client.get('/posts/', params=params, headers=headers).status_code == 422
+    assert client.get('/posts/', params={"limit": 100}, headers=headers).status_code == 200
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services import counter_service, result_cache
+from app.services.result_cache import ResultCache, cached_search
+from app.services.skill_query import parse_skill_query
+
+
+def entry_size(value: dict) -> int:
+    return len(json.dumps(value, default=str))
+
+
+def test_lru_stays_within_its_byte_bound():
+    value = {"results": ["x" * 10]}
+    cache = ResultCache(max_bytes=3 * entry_size(value))
+    for key in "abc":
+        cache.put(key, value)
+    assert cache.get("a") == value
+
+    cache.put("d", value)
+
+    # "b" was the least recently used once "a" was read
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in "acd"] == [True, True, True]
+    assert cache.size == 3 * entry_size(value)
+
+    cache.put("a", {"results": []})
+    assert cache.size == 2 * entry_size(value) + entry_size({"results": []})
+
+
+def test_entries_larger_than_the_cache_are_not_stored():
+    cache = ResultCache(max_bytes=16)
+
+    cache.put("big", {"results": ["x" * 100]})
+
+    assert cache.get("big") is None
+    assert cache.size == 0
+
+
+@pytest.fixture
+def search_cache(monkeypatch):
+    cache = ResultCache(max_bytes=1024 * 1024)
+    monkeypatch.setattr(result_cache, "search_cache", cache)
+    return cache
+
+
+def run_search(query, session, response):
+    calls = []
+
+    async def search():
+        calls.append(1)
+        return response
+
+    served = asyncio.run(cached_search("index", query, session, search, 20, None))
+    return served, len(calls)
+
+
+def test_corpus_generation_is_part_of_the_key(session, search_cache):
+    query = parse_skill_query(["Python", "docker"])
+    response = {"results": [{"pdf_id": 1, "matched_skills": ["python"]}], "complete": True}
+
+    _, ran = run_search(query, session, response)
+    assert ran == 1
+    served, ran = run_search(parse_skill_query(["docker", "PYTHON"]), session, response)
+    assert ran == 0
+    assert served["timing"]["cache"]["hit"] is True
+    # Served in the spelling of the query that hit the cache
+    assert served["results"][0]["matched_skills"] == ["PYTHON"]
+
+    counter_service.bump(counter_service.PDF_CORPUS, session)
+    session.commit()
+    _, ran = run_search(query, session, response)
+    assert ran == 1
+
+
+def test_partial_results_are_not_cached(session, search_cache):
+    query = parse_skill_query(["python"])
+    partial = {"results": [], "complete": False}
+
+    run_search(query, session, partial)
+    _, ran = run_search(query, session, partial)
+
+    assert ran == 1
+    assert search_cache.stats()["entries"] == 0
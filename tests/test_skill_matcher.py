@@ -0,0 +1,53 @@
+from app.services.skill_matcher import SkillMatcher, match_skills, scan_skills
+
+
+def test_matches_whole_words_only():
+    text = "Experienced in Javascript and scripting, some java."
+
+    assert match_skills(["java", "script", "javascript"], text) == ["java", "javascript"]
+    assert match_skills(["go"], "good google golang") == []
+
+
+def test_case_folding():
+    assert match_skills(["Python", "AWS Lambda"], "PYTHON developer, aws LAMBDA functions") == ["Python", "AWS Lambda"]
+
+
+def test_symbols_stay_part_of_the_skill():
+    text = "Wrote C++ services, Node.js tools and some C# glue."
+
+    assert match_skills(["c++", "node.js", "c#", "c", "node"], text) == ["c++", "node.js", "c#"]
+    assert match_skills(["c++"], "plain c and c#") == []
+
+
+def test_phrases_match_across_line_and_page_breaks():
+    assert match_skills(["machine learning"], "machine\nlearning") == ["machine learning"]
+    assert scan_skills(["machine learning", "docker"], ["experience with machine", "learning and docker"]) \
+        == ["machine learning", "docker"]
+    assert scan_skills(["machine learning"], ["machine", "vision", "learning"]) == []
+
+
+def test_scan_stops_pulling_pages_once_every_skill_matched():
+    pulled = []
+
+    def pages():
+        for page in ["python here", "and docker", "never read", "never read either"]:
+            pulled.append(page)
+            yield page
+
+    assert scan_skills(["docker", "python"], pages()) == ["docker", "python"]
+    assert pulled == ["python here", "and docker"]
+
+
+def test_skills_without_tokens_are_dropped():
+    matcher = SkillMatcher(["python", "++", "  ", "python"])
+
+    assert matcher.skills == ["python"]
+    pulled = []
+
+    def pages():
+        for page in ["python", "more"]:
+            pulled.append(page)
+            yield page
+
+    assert matcher.scan(pages()) == ["python"]
+    assert pulled == ["python"]
@@ -0,0 +1,86 @@
+import pytest
+
+from app.services.skill_index import ScoredMatch, SkillIndex
+from app.services.skill_query import parse_skill_query
+from app.services.skillsearch_service import decode_search_cursor, top_k
+from app.utils import encode_cursor
+
+
+def test_parse_skill_query_weights_and_required():
+    query = parse_skill_query(["python^2", " docker ", "go^0.5", ""], required=["kubernetes^3", "docker"])
+
+    assert query.skills == ("python", "docker", "go", "kubernetes")
+    assert query.weights == (2.0, 1.0, 0.5, 3.0)
+    assert query.required == {"kubernetes", "docker"}
+
+
+def test_parse_skill_query_match_all_requires_every_skill():
+    query = parse_skill_query(["python", "docker^2"], match_all=True)
+
+    assert query.required == {"python", "docker"}
+    assert query.cache_key() == parse_skill_query(["Docker^2", "PYTHON"], match_all=True).cache_key()
+
+
+@pytest.mark.parametrize("skills", [[], ["  "], ["python^x"], ["python^0"], ["python^101"]])
+def test_parse_skill_query_rejects_invalid_entries(skills):
+    with pytest.raises(ValueError):
+        parse_skill_query(skills)
+
+
+def test_rank_scores_with_bm25():
+    index = SkillIndex()
+    index.add_document(1, "python python docker")
+    index.add_document(2, "python and a much longer text about other things")
+    index.add_document(3, "docker only")
+
+    scored, unverified = index.rank(parse_skill_query(["python", "docker"]))
+
+    assert unverified == []
+    assert set(scored) == {1, 2, 3}
+    assert scored[1].matched_skills == ["python", "docker"]
+    # More occurrences in a shorter document score higher
+    assert scored[1].score > scored[2].score > 0
+
+    weighted, _ = index.rank(parse_skill_query(["python", "docker^3"]))
+    assert weighted[3].score == pytest.approx(3 * scored[3].score)
+
+    # Required skills filter the candidates, python then only adds to the score
+    required, _ = index.rank(parse_skill_query(["python"], required=["docker"]))
+    assert set(required) == {1, 3}
+    assert required[3].matched_skills == ["docker"]
+
+
+def test_top_k_breaks_score_ties_by_id():
+    scored = {doc_id: ScoredMatch(score=1.0, matched_skills=["python"]) for doc_id in (7, 3, 5)}
+    scored[9] = ScoredMatch(score=2.0, matched_skills=["python"])
+
+    assert [doc_id for doc_id, _ in top_k(scored, 3)] == [9, 3, 5]
+    assert [doc_id for doc_id, _ in top_k(scored, 3, after={"score": 1.0, "id": 3})] == [5, 7]
+
+
+def test_top_k_pages_walk_every_match_once():
+    scored = {doc_id: ScoredMatch(score=float(doc_id % 4), matched_skills=["python"]) for doc_id in range(1, 24)}
+    seen = []
+    after = None
+    while True:
+        page = top_k(scored, 5, after)
+        if not page:
+            break
+        seen.extend(doc_id for doc_id, _ in page)
+        last_id, last_match = page[-1]
+        after = decode_search_cursor(encode_cursor({"score": last_match.score, "id": last_id}))
+
+    assert sorted(seen) == list(scored)
+    assert len(seen) == len(set(seen))
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    encode_cursor({"score": 1.0}),
+    encode_cursor({"score": "high", "id": 1}),
+    encode_cursor({"score": [1.0], "id": 1}),
+    encode_cursor({"score": 1.0, "id": {"id": 1}}),
+])
+def test_decode_search_cursor_rejects_crafted_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_search_cursor(cursor)
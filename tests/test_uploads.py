@@ -0,0 +1,59 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.utilsp import uploads
+from app.utilsp.uploads import PDF_SIGNATURES, RESUME_SIGNATURES, stream_upload_to_disk, stream_uploads_to_disk
+
+
+def upload(data: bytes, filename: str = "resume.pdf") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def save(data: bytes, directory, signatures=PDF_SIGNATURES, max_bytes=None):
+    return asyncio.run(stream_upload_to_disk(upload(data), str(directory), signatures, max_bytes=max_bytes))
+
+
+def test_saves_and_hashes_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 8)
+    data = b"%PDF-1.7 some content"
+
+    saved = save(data, tmp_path)
+
+    assert saved.filename.endswith(".pdf")
+    assert saved.size == len(data)
+    assert saved.content_hash == hashlib.sha256(data).hexdigest()
+    with open(saved.filepath, "rb") as f:
+        assert f.read() == data
+
+
+@pytest.mark.parametrize("data", [b"", b"plain text", b"PK\x03\x04word", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"])
+def test_rejects_files_by_magic_bytes(tmp_path, data):
+    with pytest.raises(HTTPException) as error:
+        save(data, tmp_path, RESUME_SIGNATURES)
+
+    assert error.value.status_code == 400
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_oversized_upload_is_rejected_and_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 8)
+
+    with pytest.raises(HTTPException) as error:
+        save(b"%PDF-" + b"x" * 100, tmp_path, max_bytes=64)
+
+    assert error.value.status_code == 413
+    # The chunks written before the limit was hit are gone too
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_batch_reports_each_file(tmp_path):
+    files = [upload(b"%PDF-a", "a.pdf"), upload(b"not a pdf", "b.pdf"), upload(b"%PDF-c", "c.pdf")]
+
+    saved = asyncio.run(stream_uploads_to_disk(files, str(tmp_path), PDF_SIGNATURES, concurrency=2))
+
+    assert [isinstance(entry, HTTPException) for entry in saved] == [False, True, False]
+    assert len(list(tmp_path.iterdir())) == 2